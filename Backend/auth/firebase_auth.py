@@ -1,10 +1,120 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from firebase_admin import auth as firebase_auth
 
+import config.env  # noqa: F401  (loads .env before settings are read)
+from services.executor import run_blocking
+
 security = HTTPBearer(auto_error=False)
 
-def get_current_user(
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+AUTH_TOKEN_CACHE_TTL_SECONDS = float(os.getenv("AUTH_TOKEN_CACHE_TTL_SECONDS", "300"))
+
+# Stop serving a cached token slightly before Firebase would reject it
+EXPIRY_SKEW_SECONDS = 30
+
+
+# --------------------------------------------------
+# VERIFIED TOKEN CACHE
+# --------------------------------------------------
+class TokenCache:
+    """
+    LRU cache of decoded Firebase ID token claims.
+    Entries expire at the earlier of the token's own `exp` and the cache TTL.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            claims, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return claims
+
+    def put(self, token: str, claims: dict):
+        if self.max_size <= 0:
+            return
+
+        expires_at = time.time() + self.ttl_seconds
+        token_exp = claims.get("exp")
+        if isinstance(token_exp, (int, float)):
+            expires_at = min(expires_at, token_exp - EXPIRY_SKEW_SECONDS)
+
+        if expires_at <= time.time():
+            return
+
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+token_cache = TokenCache(AUTH_TOKEN_CACHE_SIZE, AUTH_TOKEN_CACHE_TTL_SECONDS)
+
+
+def get_token_cache_stats() -> dict:
+    return token_cache.stats()
+
+
+# --------------------------------------------------
+# FASTAPI DEPENDENCIES
+# --------------------------------------------------
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ):
     if credentials is None:
@@ -13,12 +123,28 @@ def get_current_user(
             detail="Authorization header missing"
         )
 
+    token = credentials.credentials
+    decoded_token = token_cache.get(token)
+    if decoded_token is not None:
+        return decoded_token
+
     try:
-        token = credentials.credentials
-        decoded_token = firebase_auth.verify_id_token(token)
-        return decoded_token  # contains email, uid, etc.
+        decoded_token = await run_blocking(firebase_auth.verify_id_token, token)
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token"
         )
+
+    token_cache.put(token, decoded_token)
+    return decoded_token  # contains email, uid, etc.
+
+
+async def get_current_user_email(decoded_token: dict = Depends(get_current_user)) -> str:
+    user_email = decoded_token.get("email")
+    if not user_email:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Unauthorized"
+        )
+    return user_email
@@ -0,0 +1,233 @@
+"""
+Micro-benchmark for the smart chat fallback (no LLM, no database).
+
+    cd Backend && python benchmarks/fallback_benchmark.py [days] [iterations]
+
+Reports how many full-itinerary fallback edits per second one process can run,
+then times the luxury/budget day rule tables against the inline substring
+checks they replaced (the baseline), on the same days.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.fallback_rules import BUDGET_RULES, LUXURY_RULES  # noqa: E402
+from services.itinerary_service import create_smart_modification  # noqa: E402
+
+MESSAGES = [
+    "Make the whole trip luxury, budget is high",
+    "Switch to a cheap budget please",
+    "Add day with something relaxing and update accordingly",
+    "Change day 2 to something slow and relaxing",
+    "Can you suggest a better restaurant?",
+]
+
+
+# --------------------------------------------------
+# BASELINE
+# --------------------------------------------------
+def legacy_upgrade_to_luxury(day: dict, destination: str) -> dict:
+    """The inline keyword checks the luxury rule table replaced."""
+    upgraded = dict(day)
+
+    if (
+        "hotel" in upgraded.get("morning", "").lower()
+        or "check-in" in upgraded.get("morning", "").lower()
+    ):
+        upgraded["morning"] = (
+            upgraded["morning"]
+            .replace("hotel", "luxury 5-star hotel")
+            .replace("check-in", "VIP check-in at luxury resort")
+        )
+    if (
+        "walk" in upgraded.get("morning", "").lower()
+        or "explore" in upgraded.get("morning", "").lower()
+    ):
+        upgraded["morning"] = (
+            f"Private guided tour of {destination}'s exclusive morning spots with luxury transport"
+        )
+    if "market" in upgraded.get("morning", "").lower():
+        upgraded["morning"] = (
+            f"Private shopping experience at {destination}'s high-end boutiques with personal shopper"
+        )
+
+    if (
+        "museum" in upgraded.get("afternoon", "").lower()
+        or "tour" in upgraded.get("afternoon", "").lower()
+    ):
+        upgraded["afternoon"] = (
+            f"Private VIP museum tour with expert guide, skip-the-line access"
+        )
+    elif (
+        "beach" in upgraded.get("afternoon", "").lower()
+        or "relax" in upgraded.get("afternoon", "").lower()
+    ):
+        upgraded["afternoon"] = (
+            "Private beach cabana with butler service and premium amenities"
+        )
+    elif (
+        "sightsee" in upgraded.get("afternoon", "").lower()
+        or "visit" in upgraded.get("afternoon", "").lower()
+    ):
+        upgraded["afternoon"] = (
+            f"Luxury private car tour of {destination}'s landmarks with champagne service"
+        )
+    else:
+        upgraded["afternoon"] = (
+            f"Exclusive high-end experience: {upgraded.get('afternoon', 'Leisure time')} with premium service"
+        )
+
+    if (
+        "dinner" in upgraded.get("evening", "").lower()
+        or "restaurant" in upgraded.get("evening", "").lower()
+    ):
+        upgraded["evening"] = (
+            f"Michelin-starred dinner experience at {destination}'s finest restaurant with wine pairing"
+        )
+    elif (
+        "show" in upgraded.get("evening", "").lower()
+        or "entertainment" in upgraded.get("evening", "").lower()
+    ):
+        upgraded["evening"] = (
+            f"VIP box seats at premium show with backstage access and champagne"
+        )
+    else:
+        upgraded["evening"] = (
+            f"Sunset cocktail reception at luxury rooftop bar followed by gourmet dining"
+        )
+
+    if (
+        "local" in upgraded.get("food", "").lower()
+        or "street" in upgraded.get("food", "").lower()
+    ):
+        upgraded["food"] = (
+            f"Fine dining: {upgraded['food'].replace('street food', 'gourmet cuisine').replace('local', 'premium local')}"
+        )
+    else:
+        upgraded["food"] = (
+            f"Gourmet dining experience: {upgraded.get('food', ' chef tasting menu')}"
+        )
+
+    if upgraded.get("notes"):
+        upgraded["notes"] = (
+            f"All bookings include VIP service and premium transfers. {upgraded['notes']}"
+        )
+    else:
+        upgraded["notes"] = (
+            "Includes private transfers, priority access, and concierge service"
+        )
+
+    return upgraded
+
+
+def legacy_downgrade_to_budget(day: dict, destination: str) -> dict:
+    """The inline keyword checks the budget rule table replaced."""
+    upgraded = dict(day)
+
+    if (
+        "luxury" in upgraded.get("morning", "").lower()
+        or "private" in upgraded.get("morning", "").lower()
+    ):
+        upgraded["morning"] = (
+            upgraded["morning"]
+            .replace("luxury", "comfortable")
+            .replace("private", "self-guided")
+        )
+    if "tour" in upgraded.get("morning", "").lower():
+        upgraded["morning"] = (
+            f"Self-guided walking tour of {destination} using free map app"
+        )
+
+    if (
+        "vip" in upgraded.get("afternoon", "").lower()
+        or "private" in upgraded.get("afternoon", "").lower()
+    ):
+        upgraded["afternoon"] = (
+            upgraded["afternoon"].replace("VIP", "Standard").replace("private", "group")
+        )
+    if (
+        "car" in upgraded.get("afternoon", "").lower()
+        or "transport" in upgraded.get("afternoon", "").lower()
+    ):
+        upgraded["afternoon"] = (
+            f"Public transport exploration of {destination} (buy day pass)"
+        )
+
+    if (
+        "michelin" in upgraded.get("evening", "").lower()
+        or "fine dining" in upgraded.get("evening", "").lower()
+    ):
+        upgraded["evening"] = (
+            "Casual dinner at highly-rated local eatery or food market"
+        )
+
+    upgraded["food"] = (
+        f"Budget-friendly: {upgraded.get('food', 'local street food and markets')}"
+    )
+
+    upgraded["notes"] = (
+        "Budget travel tips: Use public transport, book attractions online for discounts"
+    )
+
+    return upgraded
+
+
+def sample_itinerary(num_days: int) -> dict:
+    return {
+        "overview": "A week of museums, markets and food.",
+        "days": [
+            {
+                "day": i + 1,
+                "title": f"Day {i + 1}",
+                "morning": "Hotel check-in, then walk to the old town market",
+                "afternoon": "Museum tour and a visit to the cathedral",
+                "evening": "Dinner at a local restaurant followed by a show",
+                "food": "Local street food and traditional dishes",
+                "notes": "Busy day, wear comfortable shoes" if i % 2 else "",
+            }
+            for i in range(num_days)
+        ],
+    }
+
+
+def main():
+    num_days = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    itinerary = sample_itinerary(num_days)
+    preferences = {"destination": "Lisbon", "budget": "medium"}
+
+    for message in MESSAGES:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            create_smart_modification(message, itinerary, preferences)
+        elapsed = time.perf_counter() - start
+
+        print(
+            f"{message[:45]:<45}  {iterations / elapsed:>9.0f} itineraries/s  "
+            f"{elapsed / iterations * 1e6:>7.1f} us/itinerary ({num_days} days)"
+        )
+
+    print()
+    days = itinerary["days"]
+    for name, rules, baseline in (
+        ("luxury", LUXURY_RULES.apply, legacy_upgrade_to_luxury),
+        ("budget", BUDGET_RULES.apply, legacy_downgrade_to_budget),
+    ):
+        for label, transform in (("rule table", rules), ("baseline", baseline)):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                for day in days:
+                    transform(day, "Lisbon")
+            elapsed = time.perf_counter() - start
+
+            print(
+                f"{name} days, {label:<10}  "
+                f"{elapsed / iterations / len(days) * 1e6:>7.2f} us/day"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Micro-benchmark for parsing model responses (no LLM, no database).
+
+    cd Backend && python benchmarks/llm_json_benchmark.py [days] [iterations]
+
+Compares services.llm_json against the previous multi-strategy extraction on
+a large fenced itinerary: clean, with trailing commas to repair, cut off at
+the token limit (which must be rejected, not repaired), and with a stray "{"
+in the prose before the JSON. extract_json_object is the part comparable to
+the legacy cascade; parse_itinerary_json adds schema validation.
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.llm_json import (  # noqa: E402
+    LLMJSONError,
+    extract_json_object,
+    parse_itinerary_json,
+)
+
+
+def legacy_extract(text: str) -> dict:
+    """The split/find/json.loads cascade previously used for chat replies."""
+    text = text.strip()
+    for fence in ("```json", "```"):
+        if fence in text:
+            try:
+                return json.loads(text.split(fence)[1].split("```")[0].strip())
+            except ValueError:
+                pass
+    try:
+        start, end = text.find("{"), text.rfind("}")
+        if start != -1 and end > start:
+            return json.loads(text[start : end + 1])
+    except ValueError:
+        pass
+    try:
+        return json.loads(text)
+    except ValueError:
+        return {}
+
+
+def sample_response(num_days: int) -> str:
+    itinerary = {
+        "overview": "A long trip " * 20,
+        "days": [
+            {
+                "day": i + 1,
+                "title": f"Day {i + 1} in the old town",
+                "morning": "Walk through the historic centre and visit the cathedral. " * 4,
+                "afternoon": "Museum tour, then coffee at a {local} favourite. " * 4,
+                "evening": "Dinner at a family-run restaurant with live music. " * 4,
+                "food": "Regional specialities, street food and pastries",
+                "notes": "Book tickets ahead; wear comfortable shoes",
+            }
+            for i in range(num_days)
+        ],
+    }
+    return "Here is your itinerary:\n```json\n" + json.dumps(itinerary, indent=2) + "\n```"
+
+
+def bench(label: str, func, text: str, iterations: int):
+    # Silence the per-call "Repaired malformed JSON" log lines
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            try:
+                func(text)
+            except LLMJSONError:
+                pass
+        elapsed = time.perf_counter() - start
+    print(f"{label:<42} {elapsed / iterations * 1e6:>9.1f} us/response")
+
+
+def main():
+    num_days = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    clean = sample_response(num_days)
+    trailing_commas = clean.replace('"\n    }', '",\n    }')
+    truncated = clean[: int(len(clean) * 0.9)]
+    preamble_brace = clean.replace("Here is your itinerary:", "Use the { key to expand each day:")
+
+    print(f"{num_days}-day response, {len(clean) // 1024} KiB")
+    for name, text in [
+        ("clean", clean),
+        ("trailing commas", trailing_commas),
+        ("truncated", truncated),
+        ("preamble brace", preamble_brace),
+    ]:
+        bench(f"legacy extraction ({name})", legacy_extract, text, iterations)
+        bench(f"extract_json_object ({name})", extract_json_object, text, iterations)
+        bench(f"parse_itinerary_json ({name})", parse_itinerary_json, text, iterations)
+        legacy_ok = bool(legacy_extract(text))
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                parse_itinerary_json(text)
+            new_ok = True
+        except LLMJSONError:
+            new_ok = False
+        print(f"  usable result: legacy={legacy_ok} new={new_ok}")
+
+
+if __name__ == "__main__":
+    main()
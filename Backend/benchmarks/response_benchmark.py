@@ -0,0 +1,124 @@
+"""
+Micro-benchmark for JSON response bodies (no HTTP server, no database).
+
+    cd Backend && python benchmarks/response_benchmark.py [chat_messages] [iterations]
+
+For 7, 14 and 30-day itineraries (with a long chat history) compares the
+standard JSONResponse with FastJSONResponse, and the bytes on the wire with
+and without gzip at the level GZipMiddleware is configured with.
+"""
+import gzip
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from services.json_response import FastJSONResponse, orjson  # noqa: E402
+
+GZIP_COMPRESS_LEVEL = int(os.getenv("GZIP_COMPRESS_LEVEL", "6"))
+
+
+def sample_itinerary(num_days: int) -> dict:
+    return {
+        "success": True,
+        "data": {
+            "id": 42,
+            "user_id": "traveller@example.com",
+            "destination": "Lisbon, Portugal",
+            "start_date": "2026-05-01",
+            "end_date": f"2026-05-{num_days:02d}",
+            "preferences": {
+                "travel_style": "relaxed",
+                "food_preferences": ["seafood", "vegetarian", "street food"],
+                "interests": ["history", "architecture", "music", "beaches"],
+                "budget": "medium",
+                "group_size": 2,
+                "special_requirements": "Step-free access where possible",
+            },
+            "itinerary": {
+                "overview": "A slow trip through Lisbon and the coast. " * 10,
+                "days": [
+                    {
+                        "day": i + 1,
+                        "title": f"Day {i + 1}: Alfama, viewpoints and fado",
+                        "morning": "Tram 28 to the castle, then the cathedral and a café stop. " * 3,
+                        "afternoon": "Tile museum, riverside walk and a pastry tasting in Belém. " * 3,
+                        "evening": "Dinner at a tasca followed by a fado show in Alfama. " * 3,
+                        "food": "Grilled sardines, bacalhau à brás, pastéis de nata",
+                        "notes": "Buy a Viva Viagem card; wear comfortable shoes on the hills",
+                    }
+                    for i in range(num_days)
+                ],
+            },
+            "created_at": "2026-04-01 10:00:00.000000",
+            "updated_at": "2026-04-02 12:30:00.000000",
+        },
+    }
+
+
+def sample_chat(num_messages: int) -> dict:
+    return {
+        "success": True,
+        "data": [
+            {
+                "id": i + 1,
+                "role": "user" if i % 2 == 0 else "assistant",
+                "content": (
+                    "Can you make day 3 more relaxed and add a beach afternoon?"
+                    if i % 2 == 0
+                    else "I've updated day 3: a slower morning, then an afternoon at Cascais beach. " * 4
+                ),
+                "created_at": f"2026-04-02 12:{i % 60:02d}:00.000000",
+            }
+            for i in range(num_messages)
+        ],
+    }
+
+
+def per_call_us(func, payload, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(payload)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def report(label: str, payload, iterations: int):
+    # FastAPI runs jsonable_encoder before the response class renders
+    encoded = jsonable_encoder(payload)
+    body = JSONResponse(encoded).body
+    assert FastJSONResponse(encoded).body == body
+
+    compressed = gzip.compress(body, compresslevel=GZIP_COMPRESS_LEVEL)
+
+    print(label)
+    print(f"  {'jsonable_encoder':<34} {per_call_us(jsonable_encoder, payload, iterations):>9.1f} us")
+    print(f"  {'JSONResponse':<34} {per_call_us(JSONResponse, encoded, iterations):>9.1f} us")
+    print(f"  {'FastJSONResponse':<34} {per_call_us(FastJSONResponse, encoded, iterations):>9.1f} us")
+    print(
+        f"  {f'gzip (level {GZIP_COMPRESS_LEVEL})':<34} "
+        f"{per_call_us(lambda b: gzip.compress(b, GZIP_COMPRESS_LEVEL), body, iterations):>9.1f} us"
+    )
+    print(
+        f"  {'bytes on the wire':<34} {len(body):>9} -> {len(compressed)} gzipped "
+        f"({len(compressed) / len(body):.0%})"
+    )
+
+
+def main():
+    num_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    if orjson is None:
+        print("orjson is not installed: FastJSONResponse uses the standard encoder\n")
+
+    for num_days in (7, 14, 30):
+        report(f"GET /api/itineraries/{{id}} ({num_days} days)", sample_itinerary(num_days), iterations)
+    report(f"GET /api/itineraries/{{id}}/chat ({num_messages} messages)", sample_chat(num_messages), iterations)
+
+
+if __name__ == "__main__":
+    main()
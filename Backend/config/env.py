@@ -0,0 +1,6 @@
+from dotenv import load_dotenv
+
+# Modules read their settings with os.getenv when they are imported. Each of
+# them imports this module first, so .env is loaded before any setting is read,
+# whichever module happens to be imported first.
+load_dotenv()
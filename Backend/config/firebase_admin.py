@@ -3,6 +3,8 @@ import json
 import firebase_admin
 from firebase_admin import credentials
 
+import config.env  # noqa: F401  (loads .env before settings are read)
+
 if not firebase_admin._apps:
 
     firebase_key = os.environ.get("FIREBASE_SERVICE_ACCOUNT")
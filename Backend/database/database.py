@@ -1,56 +1,241 @@
+import os
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import config.env  # noqa: F401  (loads .env before settings are read)
+from database.migrations import run_migrations
+from services.executor import BLOCKING_WORKER_THREADS
 
 DB_NAME = "itineraries.db"
 
+# Every blocking worker thread can hold a connection; the headroom covers
+# connections borrowed outside the workers (startup, tests, streaming) so
+# they never wait behind a fully busy thread pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", str(BLOCKING_WORKER_THREADS + 8)))
+if DB_POOL_SIZE <= BLOCKING_WORKER_THREADS:
+    print(
+        f"Warning: DB_POOL_SIZE ({DB_POOL_SIZE}) is not larger than "
+        f"BLOCKING_WORKER_THREADS ({BLOCKING_WORKER_THREADS}); requests may wait for a connection"
+    )
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10"))
+
+# Connection-level tuning applied once per pooled connection
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -20000",  # ~20 MB page cache
+    "PRAGMA mmap_size = 268435456",  # 256 MB memory-mapped I/O
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+
+
+# --------------------------------------------------
+# CONNECTION POOL
+# --------------------------------------------------
+class PooledConnection:
+    """
+    Thin wrapper around a pooled sqlite3 connection.
+    close() hands the connection back to the pool instead of closing it, so
+    existing `conn = get_db_connection() ... conn.close()` call sites keep working.
+    """
+
+    def __init__(self, pool: "ConnectionPool", conn: sqlite3.Connection):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        conn = self.__dict__.get("_conn")
+        if conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a released connection.")
+        return getattr(conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self._conn.__exit__(*exc_info)
+
+    def close(self):
+        conn = self.__dict__.get("_conn")
+        if conn is not None:
+            self._conn = None
+            self._pool.release(conn)
+
+    def __del__(self):
+        # Return connections leaked by an early exception path
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+# Put on the idle queue in place of a dropped connection: whoever takes it
+# opens a fresh connection in that slot, so waiters are woken either way
+_REOPEN = None
+
+
+class ConnectionPool:
+    """Bounded pool of long-lived SQLite connections shared by all worker threads."""
+
+    def __init__(self, database: str, max_size: int, timeout: float):
+        self.database = database
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._acquired = 0
+        self._reused = 0
+        self._waited = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.database, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        with self._lock:
+            self._acquired += 1
+            self._in_use += 1
+            must_wait = False
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                if self._created < self.max_size:
+                    # A new slot: its connection is opened below
+                    self._created += 1
+                    conn = _REOPEN
+                else:
+                    self._waited += 1
+                    must_wait = True
+
+        if must_wait:
+            try:
+                conn = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                with self._lock:
+                    self._in_use -= 1
+                raise sqlite3.OperationalError("Timed out waiting for a database connection")
+
+        if conn is not _REOPEN:
+            with self._lock:
+                self._reused += 1
+            return conn
+
+        try:
+            return self._connect()
+        except Exception:
+            # Give the slot back, waking the next waiter to try again
+            with self._lock:
+                self._in_use -= 1
+            self._idle.put(_REOPEN)
+            raise
+
+    def release(self, conn: sqlite3.Connection):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Broken connection: drop it and hand its slot to the next acquire,
+            # which opens a fresh connection (a waiter is woken by the put)
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            with self._lock:
+                self._in_use -= 1
+            self._idle.put(_REOPEN)
+            return
+
+        with self._lock:
+            self._in_use -= 1
+        self._idle.put(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if conn is not _REOPEN:
+                conn.close()
+            with self._lock:
+                self._created -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "database": self.database,
+                "max_size": self.max_size,
+                "open_connections": self._created,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+                "acquired": self._acquired,
+                "reused": self._reused,
+                "waited": self._waited,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None or _pool.database != DB_NAME:
+        with _pool_lock:
+            if _pool is None or _pool.database != DB_NAME:
+                if _pool is not None:
+                    _pool.close_all()
+                _pool = ConnectionPool(DB_NAME, DB_POOL_SIZE, DB_POOL_TIMEOUT_SECONDS)
+    return _pool
+
 
 def get_db_connection():
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    return conn
+    pool = get_pool()
+    return PooledConnection(pool, pool.acquire())
 
 
-def init_db():
+@contextmanager
+def db_connection():
+    """Borrow a pooled connection for the duration of a `with` block."""
     conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Existing itineraries table
-    cursor.execute(
-        """
-    CREATE TABLE IF NOT EXISTS itineraries (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id TEXT,
-        destination TEXT,
-        start_date TEXT,
-        end_date TEXT,
-        preferences TEXT,
-        itinerary TEXT,
-        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-    )
-    """
-    )
+    try:
+        yield conn
+    finally:
+        conn.close()
 
-    # NEW: Chat messages table
-    cursor.execute(
-        """
-    CREATE TABLE IF NOT EXISTS chat_messages (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        itinerary_id INTEGER,
-        role TEXT NOT NULL,  -- 'user' or 'assistant'
-        content TEXT NOT NULL,
-        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (itinerary_id) REFERENCES itineraries(id) ON DELETE CASCADE
-    )
-    """
-    )
 
-    # Index for faster chat history queries
-    cursor.execute(
-        """
-    CREATE INDEX IF NOT EXISTS idx_chat_itinerary 
-    ON chat_messages(itinerary_id)
+def close_pool():
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+
+
+def get_pool_stats() -> dict:
+    return get_pool().stats()
+
+
+def utc_timestamp(seconds_ago: float = 0) -> str:
     """
-    )
+    UTC time as stored in timestamp columns: ISO 8601 with offset and fixed
+    microsecond precision, so stored values compare in time order as strings.
+    """
+    moment = datetime.now(timezone.utc) - timedelta(seconds=seconds_ago)
+    return moment.isoformat(timespec="microseconds")
+
+
+def init_db():
+    """Bring the database up to the current schema version."""
+    with db_connection() as conn:
+        version = run_migrations(conn)
 
-    conn.commit()
-    conn.close()
+    print(f"Database ready (schema version {version})")
@@ -0,0 +1,249 @@
+import json
+import sqlite3
+
+# --------------------------------------------------
+# SCHEMA MIGRATIONS
+# --------------------------------------------------
+# Each migration brings the database from version N-1 to N. The current version
+# is stored in SQLite's built-in `PRAGMA user_version`, so migrations run once
+# per database at startup and the query paths can assume the latest schema.
+
+
+def _column_names(cursor: sqlite3.Cursor, table: str) -> set:
+    cursor.execute(f"PRAGMA table_info({table})")
+    return {col[1] for col in cursor.fetchall()}
+
+
+def _create_base_tables(cursor: sqlite3.Cursor):
+    cursor.execute(
+        """
+    CREATE TABLE IF NOT EXISTS itineraries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT,
+        destination TEXT,
+        start_date TEXT,
+        end_date TEXT,
+        preferences TEXT,
+        itinerary TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """
+    )
+
+    cursor.execute(
+        """
+    CREATE TABLE IF NOT EXISTS chat_messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        itinerary_id INTEGER,
+        role TEXT NOT NULL,  -- 'user' or 'assistant'
+        content TEXT NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (itinerary_id) REFERENCES itineraries(id) ON DELETE CASCADE
+    )
+    """
+    )
+
+    cursor.execute(
+        """
+    CREATE INDEX IF NOT EXISTS idx_chat_itinerary
+    ON chat_messages(itinerary_id)
+    """
+    )
+
+
+def _add_itinerary_updated_at(cursor: sqlite3.Cursor):
+    # Databases created before updated_at existed only have created_at
+    if "updated_at" in _column_names(cursor, "itineraries"):
+        return
+
+    # ALTER TABLE cannot add a column with a non-constant default
+    cursor.execute("ALTER TABLE itineraries ADD COLUMN updated_at DATETIME")
+    cursor.execute(
+        "UPDATE itineraries SET updated_at = created_at WHERE updated_at IS NULL"
+    )
+
+
+def _create_generation_cache(cursor: sqlite3.Cursor):
+    cursor.execute(
+        """
+    CREATE TABLE IF NOT EXISTS generation_cache (
+        cache_key TEXT PRIMARY KEY,
+        itinerary TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        last_used_at REAL NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0
+    )
+    """
+    )
+
+    cursor.execute(
+        """
+    CREATE INDEX IF NOT EXISTS idx_generation_cache_last_used
+    ON generation_cache(last_used_at)
+    """
+    )
+
+
+def _index_itineraries_by_user(cursor: sqlite3.Cursor):
+    # Serves the per-user listing ordered by created_at (rowid breaks ties)
+    cursor.execute(
+        """
+    CREATE INDEX IF NOT EXISTS idx_itineraries_user_created
+    ON itineraries(user_id, created_at)
+    """
+    )
+
+
+def _index_chat_messages_by_id(cursor: sqlite3.Cursor):
+    # Serves tail reads and before_id pagination of a conversation
+    cursor.execute(
+        """
+    CREATE INDEX IF NOT EXISTS idx_chat_itinerary_id
+    ON chat_messages(itinerary_id, id)
+    """
+    )
+    cursor.execute("DROP INDEX IF EXISTS idx_chat_itinerary")
+
+
+def _create_generation_jobs(cursor: sqlite3.Cursor):
+    cursor.execute(
+        """
+    CREATE TABLE IF NOT EXISTS generation_jobs (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        status TEXT NOT NULL,  -- 'queued', 'running', 'succeeded' or 'failed'
+        request TEXT NOT NULL,
+        result TEXT,
+        error TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """
+    )
+
+    cursor.execute(
+        """
+    CREATE INDEX IF NOT EXISTS idx_generation_jobs_user
+    ON generation_jobs(user_id, created_at)
+    """
+    )
+
+    cursor.execute(
+        """
+    CREATE INDEX IF NOT EXISTS idx_generation_jobs_status
+    ON generation_jobs(status, updated_at)
+    """
+    )
+
+
+# Day fields as of migration 7; later changes to the app's fields must not
+# change what this migration does
+_MIGRATION_7_DAY_FIELDS = ("title", "morning", "afternoon", "evening", "food", "notes")
+
+
+def _create_itinerary_days(cursor: sqlite3.Cursor):
+    # One row per day, so a single day can be read or rewritten without
+    # decoding the whole plan; itineraries.itinerary keeps everything else
+    cursor.execute(
+        """
+    CREATE TABLE IF NOT EXISTS itinerary_days (
+        itinerary_id INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        title TEXT,
+        morning TEXT,
+        afternoon TEXT,
+        evening TEXT,
+        food TEXT,
+        notes TEXT,
+        extra TEXT,  -- JSON object with any other keys of the day
+        PRIMARY KEY (itinerary_id, day),
+        FOREIGN KEY (itinerary_id) REFERENCES itineraries(id) ON DELETE CASCADE
+    ) WITHOUT ROWID
+    """
+    )
+
+    cursor.execute("SELECT id, itinerary FROM itineraries")
+    for itinerary_id, blob in cursor.fetchall():
+        try:
+            itinerary = json.loads(blob)
+        except (TypeError, ValueError):
+            continue
+        if not isinstance(itinerary, dict) or not isinstance(
+            itinerary.get("days"), list
+        ):
+            continue
+
+        rows = []
+        for number, day in enumerate(itinerary.pop("days"), start=1):
+            day = day if isinstance(day, dict) else {}
+            columns, extra = [], {}
+            for field in _MIGRATION_7_DAY_FIELDS:
+                value = day.get(field)
+                columns.append(value if value is None or isinstance(value, str) else None)
+                if value is not None and not isinstance(value, str):
+                    extra[field] = value
+            extra.update(
+                (k, v)
+                for k, v in day.items()
+                if k != "day" and k not in _MIGRATION_7_DAY_FIELDS
+            )
+            rows.append(
+                (itinerary_id, number, *columns, json.dumps(extra) if extra else None)
+            )
+
+        cursor.executemany(
+            """
+            INSERT OR REPLACE INTO itinerary_days (
+                itinerary_id, day, title, morning, afternoon, evening, food, notes, extra
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+        cursor.execute(
+            "UPDATE itineraries SET itinerary = ? WHERE id = ?",
+            (json.dumps(itinerary), itinerary_id),
+        )
+
+
+MIGRATIONS = [
+    _create_base_tables,  # 1
+    _add_itinerary_updated_at,  # 2
+    _create_generation_cache,  # 3
+    _index_itineraries_by_user,  # 4
+    _index_chat_messages_by_id,  # 5
+    _create_generation_jobs,  # 6
+    _create_itinerary_days,  # 7
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(conn) -> int:
+    """Apply all pending migrations in order and return the resulting schema version."""
+    current = get_schema_version(conn)
+
+    if current > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema version {current} is newer than this app supports ({SCHEMA_VERSION})"
+        )
+
+    for version, migration in enumerate(MIGRATIONS[current:], start=current + 1):
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {version}")
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        print(f"Applied database migration {version}: {migration.__name__}")
+
+    return get_schema_version(conn)
@@ -1,33 +1,88 @@
 import os
-import json
-from typing import List, Optional
+import asyncio
+from typing import List, Literal, Optional
 
-from fastapi import FastAPI, HTTPException, Depends, Response
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
-from dotenv import load_dotenv
 
 import google.generativeai as genai
-from firebase_admin import auth as firebase_auth
 from fastapi.openapi.utils import get_openapi
 
+import config.env  # noqa: F401  (loads .env before settings are read)
 from config.firebase_admin import firebase_admin
-from database.database import init_db
+from auth.firebase_auth import get_current_user_email, get_token_cache_stats
+from database.database import init_db, close_pool, get_pool_stats
 from services.itinerary_service import (
     save_itinerary,
     get_itineraries_by_user,
+    iter_user_itineraries,
+    get_itinerary_page,
     get_itinerary_by_id,
+    get_itinerary_version,
+    get_itineraries_version,
+    get_chat_history_version,
+    get_itinerary_day,
+    update_itinerary_day,
     process_chat_and_update,
+    stream_chat_and_update,
     get_chat_history,
-    delete_itinerary  # Added delete service import
+    get_chat_history_page,
+    delete_itinerary,  # Added delete service import
+    get_chat_llm,
+    ConcurrentModificationError,
+)
+from services.export_service import (  # Added export service import
+    content_disposition,
+    export_filename,
+    export_media_type,
+    get_cached_export,
+    get_export_cache_stats,
+    stream_export,
+    stream_itineraries_zip,
+)
+from services.json_response import FastJSONResponse
+from services.itinerary_cache import get_itinerary_cache_stats, itinerary_cache
+from services.http_cache import cache_headers, etag_matches, make_etag, not_modified
+from services.llm_service import (
+    generate_content,
+    stream_content,
+    get_generative_model,
+    get_llm_stats,
+)
+from services.llm_json import LLMJSONError, parse_itinerary_json
+from services.itinerary_stream import IncrementalJSONParser, format_sse, SSE_HEADERS
+from services.generation_cache import (
+    make_cache_key,
+    get_cached_itinerary,
+    store_cached_itinerary,
+    get_generation_cache_stats,
+)
+from services.executor import iterate_blocking, run_blocking, shutdown_executor, get_executor_stats
+from services.circuit_breaker import get_circuit_stats
+from services.model_ladder import CHAT_MODEL_LADDER, get_model_ladder_stats
+from services.job_queue import (
+    JobRateLimitError,
+    enqueue_generation_job,
+    get_job,
+    get_job_queue_stats,
+    start_job_workers,
+    stop_job_workers,
+)
+from services.chat_coordinator import (
+    ChatBusyError,
+    CHAT_BUSY_RETRY_AFTER_SECONDS,
+    run_chat_edit,
+    itinerary_edit_slot,
+    is_itinerary_busy,
+    get_chat_coordinator_stats,
 )
-from services.export_service import generate_itinerary_markdown  # Added export service import
 
 # --------------------------------------------------
-# Load environment variables
+# Load environment variables (.env is loaded by config.env)
 # --------------------------------------------------
-load_dotenv()
 api_key = os.getenv("GOOGLE_API_KEY")
 
 if not api_key:
@@ -40,13 +95,15 @@ else:
 # --------------------------------------------------
 # FastAPI App
 # --------------------------------------------------
-app = FastAPI(title="Backend API", version="0.1.0")
+app = FastAPI(
+    title="Backend API",
+    version="0.1.0",
+    default_response_class=FastJSONResponse,
+)
 
 # --------------------------------------------------
 # Swagger + Firebase Bearer Auth
 # --------------------------------------------------
-bearer_scheme = HTTPBearer(auto_error=True)
-
 def custom_openapi():
     if app.openapi_schema:
         return app.openapi_schema
@@ -86,9 +143,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --------------------------------------------------
+# Compression
+# --------------------------------------------------
+# Responses at least GZIP_MINIMUM_SIZE bytes are gzipped for clients that accept
+# it; Server-Sent Events streams are left uncompressed by the middleware
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1000"))
+GZIP_COMPRESS_LEVEL = int(os.getenv("GZIP_COMPRESS_LEVEL", "6"))
+
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=GZIP_MINIMUM_SIZE,
+    compresslevel=GZIP_COMPRESS_LEVEL,
+)
+
 # --------------------------------------------------
 # Schemas
 # --------------------------------------------------
+DEFAULT_PAGE_SIZE = 20
+
+
 class TravelPreferenceRequest(BaseModel):
     destination: str
     start_date: str
@@ -105,11 +179,23 @@ class ChatMessageRequest(BaseModel):
     message: str
 
 
+class ItineraryDayUpdateRequest(BaseModel):
+    title: Optional[str] = None
+    morning: Optional[str] = None
+    afternoon: Optional[str] = None
+    evening: Optional[str] = None
+    food: Optional[str] = None
+    notes: Optional[str] = None
+
+
 class ChatResponse(BaseModel):
     success: bool
     response_message: str
     updated_itinerary: dict
+    # Messages saved by this turn; chat_history is only the latest page
+    new_messages: List[dict]
     chat_history: List[dict]
+    next_before_id: Optional[int] = None
 
 # --------------------------------------------------
 # Helper: Prompt Builder
@@ -144,134 +230,473 @@ JSON format:
 }}
 """
 
+
+async def save_generated_itinerary(
+    data: TravelPreferenceRequest, user_email: str, itinerary_json: dict, cached: bool
+) -> dict:
+    itinerary_id = await run_blocking(
+        save_itinerary,
+        user_id=user_email,
+        destination=data.destination,
+        start_date=data.start_date,
+        end_date=data.end_date,
+        preferences=data.dict(),
+        itinerary=itinerary_json
+    )
+
+    return {
+        "success": True,
+        "message": "Itinerary generated successfully",
+        "data": {
+            "itinerary_id": itinerary_id,
+            "user_email": user_email,
+            "itinerary": itinerary_json,
+            "cached": cached
+        }
+    }
+
+async def generate_and_save_itinerary(data: TravelPreferenceRequest, user_email: str) -> dict:
+    cache_key = make_cache_key(data.dict())
+    itinerary_json = await run_blocking(get_cached_itinerary, cache_key)
+    cached = itinerary_json is not None
+
+    if not cached:
+        prompt = build_itinerary_prompt(data)
+        response_text = await generate_content(prompt)
+        itinerary_json = parse_itinerary_json(response_text)
+        await run_blocking(store_cached_itinerary, cache_key, itinerary_json)
+
+    return await save_generated_itinerary(data, user_email, itinerary_json, cached)
+
+
+async def run_generation_job(request: dict, user_email: str) -> dict:
+    """Background job handler: same work as POST /api/generate-itinerary."""
+    if not genai_configured:
+        raise RuntimeError("Google API key not configured")
+
+    result = await generate_and_save_itinerary(TravelPreferenceRequest(**request), user_email)
+    return result["data"]
+
 # --------------------------------------------------
 # Startup
 # --------------------------------------------------
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    if genai_configured:
+        # Create the shared LLM clients up front instead of on the first request
+        get_generative_model()
+        for model_name in CHAT_MODEL_LADDER:
+            get_chat_llm(model_name)
+
+    await start_job_workers(run_generation_job)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await stop_job_workers()
+    shutdown_executor()
+    close_pool()
 
 # --------------------------------------------------
 # Routes
 # --------------------------------------------------
+@app.get("/api/metrics", dependencies=[Depends(get_current_user_email)])
+async def get_metrics():
+    return {
+        "success": True,
+        "data": {
+            "blocking_pool": get_executor_stats(),
+            "db_pool": get_pool_stats(),
+            "llm": get_llm_stats(),
+            "auth_token_cache": get_token_cache_stats(),
+            "generation_cache": get_generation_cache_stats(),
+            "chat_edits": get_chat_coordinator_stats(),
+            "generation_jobs": get_job_queue_stats(),
+            "llm_circuits": get_circuit_stats(),
+            "chat_models": get_model_ladder_stats(),
+            "export_cache": get_export_cache_stats(),
+            "itinerary_cache": get_itinerary_cache_stats(),
+        },
+    }
+
+
 @app.post("/api/generate-itinerary")
 async def generate_itinerary(
     data: TravelPreferenceRequest,
-    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)
+    background: bool = False,
+    user_email: str = Depends(get_current_user_email)
 ):
+    """
+    Generate and save an itinerary. With `?background=true` the work is queued
+    instead and a job id is returned immediately (poll GET /api/jobs/{job_id}).
+    """
     if not genai_configured:
         raise HTTPException(status_code=500, detail="Google API key not configured")
 
-    try:
-        decoded_token = firebase_auth.verify_id_token(credentials.credentials)
-        user_email = decoded_token.get("email")
+    if background:
+        try:
+            job = await enqueue_generation_job(user_email, data.dict())
+        except JobRateLimitError as e:
+            raise HTTPException(status_code=429, detail=str(e))
+
+        return JSONResponse(
+            status_code=202,
+            content={
+                "success": True,
+                "message": "Itinerary generation queued",
+                "data": {"job_id": job["id"], "status": job["status"]}
+            }
+        )
 
-        if not user_email:
-            raise HTTPException(status_code=401, detail="Unauthorized")
+    try:
+        return await generate_and_save_itinerary(data, user_email)
 
-        model = genai.GenerativeModel("gemini-2.5-flash-lite")
-        prompt = build_itinerary_prompt(data)
-        response = model.generate_content(prompt)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Itinerary generation timed out")
+    except LLMJSONError as e:
+        raise HTTPException(status_code=502, detail=f"Invalid itinerary from model: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        raw_text = response.text.strip()
-        if raw_text.startswith("```"):
-            raw_text = raw_text.replace("```json", "").replace("```", "").strip()
 
-        itinerary_json = json.loads(raw_text[raw_text.find("{"): raw_text.rfind("}") + 1])
+@app.post("/api/generate-itinerary/stream")
+async def generate_itinerary_stream(
+    data: TravelPreferenceRequest,
+    user_email: str = Depends(get_current_user_email)
+):
+    """
+    Server-Sent Events variant of /api/generate-itinerary.
+    Emits `overview` and one `day` event per completed day while Gemini is still
+    generating, then `complete` with the saved itinerary (or `error`).
+    """
+    if not genai_configured:
+        raise HTTPException(status_code=500, detail="Google API key not configured")
 
-        itinerary_id = save_itinerary(
-            user_id=user_email,
-            destination=data.destination,
-            start_date=data.start_date,
-            end_date=data.end_date,
-            preferences=data.dict(),
-            itinerary=itinerary_json
+    async def event_stream():
+        parser = IncrementalJSONParser(
+            array_paths=[("days",)], string_paths=[("overview",)]
         )
 
-        return {
-            "success": True,
-            "message": "Itinerary generated successfully",
-            "data": {
-                "itinerary_id": itinerary_id,
-                "user_email": user_email,
-                "itinerary": itinerary_json
-            }
-        }
+        try:
+            cache_key = make_cache_key(data.dict())
+            itinerary_json = await run_blocking(get_cached_itinerary, cache_key)
+            cached = itinerary_json is not None
+
+            if cached:
+                yield format_sse("overview", {"overview": itinerary_json.get("overview", "")})
+                for day in itinerary_json.get("days", []):
+                    yield format_sse("day", day)
+            else:
+                async for chunk in stream_content(build_itinerary_prompt(data)):
+                    for kind, _, value in parser.feed(chunk):
+                        if kind == "item":
+                            yield format_sse("day", value)
+                        elif kind == "string":
+                            yield format_sse("overview", {"overview": value})
+
+                itinerary_json = parse_itinerary_json(parser.text)
+                await run_blocking(store_cached_itinerary, cache_key, itinerary_json)
+
+            yield format_sse(
+                "complete",
+                await save_generated_itinerary(data, user_email, itinerary_json, cached)
+            )
+
+        except asyncio.TimeoutError:
+            yield format_sse("error", {"detail": "Itinerary generation timed out"})
+        except Exception as e:
+            yield format_sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(), media_type="text/event-stream", headers=SSE_HEADERS
+    )
+
+
+@app.get("/api/llm/circuit", dependencies=[Depends(get_current_user_email)])
+async def get_llm_circuit():
+    """State of the chat LLM circuit breakers (open circuits route chat to the smart fallback)."""
+    return {"success": True, "data": get_circuit_stats()}
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/jobs/{job_id}")
+async def get_generation_job(
+    job_id: str,
+    user_email: str = Depends(get_current_user_email)
+):
+    job = await run_blocking(get_job, job_id, user_email)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return {"success": True, "data": job}
 
 
 @app.get("/api/itineraries")
 async def get_user_itineraries(
-    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    cursor: Optional[str] = None,
+    view: Literal["summary", "full"] = "summary",
+    if_none_match: Optional[str] = Header(None),
+    user_email: str = Depends(get_current_user_email)
 ):
-    decoded_token = firebase_auth.verify_id_token(credentials.credentials)
-    user_email = decoded_token.get("email")
+    """
+    Without `limit` every itinerary is returned in full (legacy behaviour).
+    With `limit`, results are keyset-paginated: pass `next_cursor` back as `cursor`
+    to get the following page. `view=summary` returns day counts and an overview
+    snippet instead of the full itinerary JSON.
+    """
+    version = await run_blocking(get_itineraries_version, user_email)
+    etag = make_etag("itineraries", user_email, version, limit, cursor, view)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    # Rows are plain JSON types, so the response skips jsonable_encoder
+    if limit is None and cursor is None:
+        return FastJSONResponse(
+            {
+                "success": True,
+                "data": await run_blocking(get_itineraries_by_user, user_email)
+            },
+            headers=cache_headers(etag)
+        )
 
-    if not user_email:
-        raise HTTPException(status_code=401, detail="Unauthorized")
+    try:
+        page = await run_blocking(
+            get_itinerary_page,
+            user_email,
+            limit or DEFAULT_PAGE_SIZE,
+            cursor,
+            view == "summary",
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return FastJSONResponse(
+        {
+            "success": True,
+            "data": page["items"],
+            "next_cursor": page["next_cursor"]
+        },
+        headers=cache_headers(etag)
+    )
 
-    return {
-        "success": True,
-        "data": get_itineraries_by_user(user_email)
-    }
+
+# Registered before /api/itineraries/{itinerary_id} so "export" is not taken for an id
+@app.get("/api/itineraries/export")
+async def export_all_itineraries_endpoint(
+    user_email: str = Depends(get_current_user_email)
+):
+    """ZIP of every itinerary as Markdown, streamed while it is read from the database."""
+    return StreamingResponse(
+        iterate_blocking(stream_itineraries_zip(iter_user_itineraries(user_email))),
+        media_type="application/zip",
+        headers={
+            "Cache-Control": "private, no-store",
+            "Content-Disposition": "attachment; filename=itineraries.zip"
+        }
+    )
 
 
 @app.get("/api/itineraries/{itinerary_id}")
 async def get_single_itinerary(
     itinerary_id: int,
-    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)
+    if_none_match: Optional[str] = Header(None),
+    user_email: str = Depends(get_current_user_email)
 ):
-    decoded_token = firebase_auth.verify_id_token(credentials.credentials)
-    user_email = decoded_token.get("email")
+    version = await run_blocking(get_itinerary_version, itinerary_id, user_email)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Itinerary not found")
 
-    itinerary = get_itinerary_by_id(itinerary_id, user_email)
+    etag = make_etag("itinerary", itinerary_id, version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    itinerary = await run_blocking(get_itinerary_by_id, itinerary_id, user_email)
+    if itinerary and str(itinerary["updated_at"]) != str(version):
+        # A cached record written before another process's update: drop it and
+        # read the database again instead of serving it until the TTL expires
+        itinerary_cache.invalidate(itinerary_id)
+        itinerary = await run_blocking(get_itinerary_by_id, itinerary_id, user_email)
     if not itinerary:
         raise HTTPException(status_code=404, detail="Itinerary not found")
 
-    return {"success": True, "data": itinerary}
+    # The itinerary may have changed since the version lookup
+    return FastJSONResponse(
+        {"success": True, "data": itinerary},
+        headers=cache_headers(make_etag("itinerary", itinerary_id, itinerary["updated_at"]))
+    )
+
+
+@app.get("/api/itineraries/{itinerary_id}/days/{day_number}")
+async def get_single_itinerary_day(
+    itinerary_id: int,
+    day_number: int,
+    user_email: str = Depends(get_current_user_email)
+):
+    day = await run_blocking(get_itinerary_day, itinerary_id, user_email, day_number)
+    if not day:
+        raise HTTPException(status_code=404, detail="Itinerary day not found")
+
+    return {"success": True, "data": day}
+
+
+@app.patch("/api/itineraries/{itinerary_id}/days/{day_number}")
+async def update_single_itinerary_day(
+    itinerary_id: int,
+    day_number: int,
+    data: ItineraryDayUpdateRequest,
+    user_email: str = Depends(get_current_user_email)
+):
+    """Edit fields of one day; only that day's row is rewritten."""
+    changes = data.dict(exclude_none=True)
+    if not changes:
+        raise HTTPException(status_code=400, detail="No day fields to update")
+
+    try:
+        # Same per-itinerary lock as chat edits, so a chat turn is not invalidated mid-flight
+        async with itinerary_edit_slot(itinerary_id):
+            day = await run_blocking(
+                update_itinerary_day, itinerary_id, user_email, day_number, changes
+            )
+    except ChatBusyError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(CHAT_BUSY_RETRY_AFTER_SECONDS)}
+        )
+
+    if not day:
+        raise HTTPException(status_code=404, detail="Itinerary day not found")
+
+    return {"success": True, "data": day}
 
 
 @app.post("/api/itineraries/{itinerary_id}/chat", response_model=ChatResponse)
 async def chat_with_itinerary(
     itinerary_id: int,
     chat_data: ChatMessageRequest,
-    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)
+    user_email: str = Depends(get_current_user_email)
 ):
-    decoded_token = firebase_auth.verify_id_token(credentials.credentials)
-    user_email = decoded_token.get("email")
+    # Identical messages from the same user share one in-flight edit
+    coalesce_key = (user_email, " ".join(chat_data.message.lower().split()))
 
-    result = process_chat_and_update(
-        itinerary_id=itinerary_id,
-        user_email=user_email,
-        user_message=chat_data.message
-    )
+    try:
+        result = await run_chat_edit(
+            itinerary_id,
+            coalesce_key,
+            lambda: process_chat_and_update(
+                itinerary_id=itinerary_id,
+                user_email=user_email,
+                user_message=chat_data.message
+            )
+        )
+    except ChatBusyError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(CHAT_BUSY_RETRY_AFTER_SECONDS)}
+        )
+    except ConcurrentModificationError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
     return {
         "success": True,
         "response_message": result["response_message"],
         "updated_itinerary": result["updated_itinerary"],
-        "chat_history": result["chat_history"]
+        "new_messages": result["new_messages"],
+        "chat_history": result["chat_history"],
+        "next_before_id": result["next_before_id"]
     }
 
 
+@app.post("/api/itineraries/{itinerary_id}/chat/stream")
+async def chat_with_itinerary_stream(
+    itinerary_id: int,
+    chat_data: ChatMessageRequest,
+    user_email: str = Depends(get_current_user_email)
+):
+    """
+    Server-Sent Events variant of the chat endpoint.
+    Emits `token` events for the reply text and `day` events for updated days as
+    they are generated, then `complete` with the same payload as the POST route.
+    """
+    itinerary_data = await run_blocking(get_itinerary_by_id, itinerary_id, user_email)
+    if not itinerary_data:
+        raise HTTPException(status_code=404, detail="Itinerary not found")
+
+    if is_itinerary_busy(itinerary_id):
+        raise HTTPException(
+            status_code=429,
+            detail="Too many changes are in progress for this itinerary, please retry shortly",
+            headers={"Retry-After": str(CHAT_BUSY_RETRY_AFTER_SECONDS)}
+        )
+
+    async def event_stream():
+        try:
+            async with itinerary_edit_slot(itinerary_id):
+                # Re-read under the edit lock so the turn builds on the latest version
+                current = await run_blocking(get_itinerary_by_id, itinerary_id, user_email)
+                if not current:
+                    raise ValueError("Itinerary not found or access denied")
+
+                async for event, payload in stream_chat_and_update(
+                    current, chat_data.message
+                ):
+                    yield format_sse(event, payload)
+        except ChatBusyError as e:
+            yield format_sse("error", {"detail": str(e), "status_code": 429})
+        except ConcurrentModificationError as e:
+            yield format_sse("error", {"detail": str(e), "status_code": 409})
+        except Exception as e:
+            yield format_sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(), media_type="text/event-stream", headers=SSE_HEADERS
+    )
+
+
 @app.get("/api/itineraries/{itinerary_id}/chat")
 async def get_itinerary_chat_history(
     itinerary_id: int,
-    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    before_id: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None),
+    user_email: str = Depends(get_current_user_email)
 ):
-    decoded_token = firebase_auth.verify_id_token(credentials.credentials)
-    user_email = decoded_token.get("email")
-
-    itinerary = get_itinerary_by_id(itinerary_id, user_email)
-    if not itinerary:
+    """
+    Without `limit`/`before_id` the whole conversation is returned.
+    Otherwise returns the latest `limit` messages older than `before_id`;
+    pass `next_before_id` back as `before_id` to page further back.
+    """
+    # Also checks ownership, without loading the itinerary itself
+    version = await run_blocking(get_chat_history_version, itinerary_id, user_email)
+    if version is None:
         raise HTTPException(status_code=404, detail="Itinerary not found")
 
-    return {
-        "success": True,
-        "data": get_chat_history(itinerary_id)
-    }
+    etag = make_etag("chat", itinerary_id, version, limit, before_id)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    if limit is None and before_id is None:
+        return FastJSONResponse(
+            {
+                "success": True,
+                "data": await run_blocking(get_chat_history, itinerary_id)
+            },
+            headers=cache_headers(etag)
+        )
+
+    page = await run_blocking(
+        get_chat_history_page, itinerary_id, limit or DEFAULT_PAGE_SIZE, before_id
+    )
+    return FastJSONResponse(
+        {
+            "success": True,
+            "data": page["items"],
+            "next_before_id": page["next_before_id"]
+        },
+        headers=cache_headers(etag)
+    )
 
 # --------------------------------------------------
 # NEW: Export Itinerary Route
@@ -279,32 +704,50 @@ async def get_itinerary_chat_history(
 @app.get("/api/itineraries/{itinerary_id}/export")
 async def export_itinerary_endpoint(
     itinerary_id: int,
-    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)
+    export_format: Literal["markdown", "json", "ics"] = Query("markdown", alias="format"),
+    if_none_match: Optional[str] = Header(None),
+    user_email: str = Depends(get_current_user_email)
 ):
-    decoded_token = firebase_auth.verify_id_token(credentials.credentials)
-    user_email = decoded_token.get("email")
-
-    itinerary_data = get_itinerary_by_id(itinerary_id, user_email)
-    if not itinerary_data:
+    """
+    Download the itinerary as Markdown, JSON or an ICS calendar. Rendered
+    exports are cached per itinerary version, and a matching If-None-Match
+    gets a 304 without the itinerary being loaded.
+    """
+    version = await run_blocking(get_itinerary_version, itinerary_id, user_email)
+    if version is None:
         raise HTTPException(status_code=404, detail="Itinerary not found or access denied")
 
-    export_payload = {
-        "destination": itinerary_data["destination"],
-        "start_date": itinerary_data["start_date"],
-        "end_date": itinerary_data["end_date"],
-        "preferences": itinerary_data["preferences"],
-        "itinerary_data": itinerary_data["itinerary"]
-    }
+    etag = make_etag("export", itinerary_id, version, export_format)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    media_type = export_media_type(export_format)
+    cached = get_cached_export(itinerary_id, version, export_format)
+    if cached is not None:
+        content, filename = cached
+        return Response(
+            content=content,
+            media_type=media_type,
+            headers={
+                **cache_headers(etag),
+                "Content-Disposition": content_disposition(filename)
+            }
+        )
 
-    markdown_content = generate_itinerary_markdown(export_payload)
+    itinerary_data = await run_blocking(get_itinerary_by_id, itinerary_id, user_email)
+    if not itinerary_data:
+        raise HTTPException(status_code=404, detail="Itinerary not found or access denied")
 
-    filename = f"{itinerary_data['destination'].replace(' ', '_')}_itinerary.md"
+    # The itinerary may have changed since the version lookup
+    etag = make_etag("export", itinerary_id, itinerary_data["updated_at"], export_format)
+    filename = export_filename(itinerary_data["destination"], export_format)
 
-    return Response(
-        content=markdown_content,
-        media_type="text/markdown",
+    return StreamingResponse(
+        iterate_blocking(stream_export(itinerary_data, export_format)),
+        media_type=media_type,
         headers={
-            "Content-Disposition": f"attachment; filename={filename}"
+            **cache_headers(etag),
+            "Content-Disposition": content_disposition(filename)
         }
     )
 
@@ -314,12 +757,9 @@ async def export_itinerary_endpoint(
 @app.delete("/api/itineraries/{itinerary_id}")
 async def delete_itinerary_endpoint(
     itinerary_id: int,
-    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)
+    user_email: str = Depends(get_current_user_email)
 ):
-    decoded_token = firebase_auth.verify_id_token(credentials.credentials)
-    user_email = decoded_token.get("email")
-
-    success = delete_itinerary(itinerary_id, user_email)
+    success = await run_blocking(delete_itinerary, itinerary_id, user_email)
     
     if not success:
         raise HTTPException(status_code=404, detail="Could not delete itinerary. Access denied or not found.")
@@ -1,5 +1,5 @@
 from sqlalchemy import Column, Integer, String, JSON, DateTime
-from datetime import datetime
+from datetime import datetime, timezone
 from Backend.database.database import Base
 
 class Itinerary(Base):
@@ -9,4 +9,4 @@ class Itinerary(Base):
     destination = Column(String, index=True)
     preferences = Column(JSON)
     itinerary = Column(JSON)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,120 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Hashable
+
+import config.env  # noqa: F401  (loads .env before settings are read)
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+# Chat edits for one itinerary run one at a time; this many may be running or
+# waiting before further requests are rejected with ChatBusyError
+CHAT_MAX_PENDING_PER_ITINERARY = int(os.getenv("CHAT_MAX_PENDING_PER_ITINERARY", "3"))
+CHAT_BUSY_RETRY_AFTER_SECONDS = 5
+
+_stats = {"started": 0, "coalesced": 0, "rejected": 0}
+
+
+class ChatBusyError(Exception):
+    """Too many chat edits are already queued for this itinerary."""
+
+
+class _ItineraryQueue:
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0
+        self.inflight: Dict[Hashable, asyncio.Task] = {}
+
+
+_queues: Dict[int, _ItineraryQueue] = {}
+
+
+def _reserve(itinerary_id: int) -> _ItineraryQueue:
+    queue = _queues.get(itinerary_id)
+    if queue is None:
+        queue = _queues[itinerary_id] = _ItineraryQueue()
+
+    if queue.pending >= CHAT_MAX_PENDING_PER_ITINERARY:
+        _stats["rejected"] += 1
+        raise ChatBusyError(
+            "Too many changes are in progress for this itinerary, please retry shortly"
+        )
+
+    queue.pending += 1
+    _stats["started"] += 1
+    return queue
+
+
+def _release(itinerary_id: int, queue: _ItineraryQueue):
+    queue.pending -= 1
+    if queue.pending == 0 and _queues.get(itinerary_id) is queue:
+        del _queues[itinerary_id]
+
+
+def _consume_exception(task: asyncio.Task):
+    # Waiters may all have gone away; don't log "exception was never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+
+# --------------------------------------------------
+# SERIALIZED, COALESCED EDITS
+# --------------------------------------------------
+async def run_chat_edit(
+    itinerary_id: int,
+    coalesce_key: Hashable,
+    func: Callable[[], Awaitable],
+):
+    """
+    Run `func` once no other edit of this itinerary is running.
+    A request whose `coalesce_key` matches an edit that is already queued or
+    running shares that edit's result instead of triggering another LLM call.
+    The edit runs as its own task, so it completes (and is saved) even if the
+    client that started it disconnects.
+    """
+    queue = _queues.get(itinerary_id)
+    if queue is not None and coalesce_key in queue.inflight:
+        _stats["coalesced"] += 1
+        return await asyncio.shield(queue.inflight[coalesce_key])
+
+    queue = _reserve(itinerary_id)
+
+    async def serialized():
+        try:
+            async with queue.lock:
+                return await func()
+        finally:
+            queue.inflight.pop(coalesce_key, None)
+            _release(itinerary_id, queue)
+
+    task = asyncio.ensure_future(serialized())
+    task.add_done_callback(_consume_exception)
+    queue.inflight[coalesce_key] = task
+
+    return await asyncio.shield(task)
+
+
+@asynccontextmanager
+async def itinerary_edit_slot(itinerary_id: int):
+    """Hold the itinerary's edit lock for a block (used by streaming edits)."""
+    queue = _reserve(itinerary_id)
+    try:
+        async with queue.lock:
+            yield
+    finally:
+        _release(itinerary_id, queue)
+
+
+def is_itinerary_busy(itinerary_id: int) -> bool:
+    queue = _queues.get(itinerary_id)
+    return queue is not None and queue.pending >= CHAT_MAX_PENDING_PER_ITINERARY
+
+
+def get_chat_coordinator_stats() -> dict:
+    return {
+        **_stats,
+        "max_pending_per_itinerary": CHAT_MAX_PENDING_PER_ITINERARY,
+        "active_itineraries": len(_queues),
+        "pending_edits": sum(queue.pending for queue in _queues.values()),
+    }
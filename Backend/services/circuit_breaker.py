@@ -0,0 +1,204 @@
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import config.env  # noqa: F401  (loads .env before settings are read)
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+# The circuit opens once at least CIRCUIT_MIN_CALLS of the last
+# CIRCUIT_WINDOW_SIZE calls were recorded and this share of them failed
+CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_WINDOW_SIZE = int(os.getenv("CIRCUIT_WINDOW_SIZE", "20"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "3"))
+
+# Successful calls slower than this count as failures (0 disables)
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "30"))
+
+# How long an open circuit rejects calls before letting a probe through
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """The circuit is open, so the call was not attempted."""
+
+
+def _percentile(sorted_values, fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return round(sorted_values[index], 4)
+
+
+class CircuitBreaker:
+    """
+    Tracks recent outcomes of calls to one dependency (an LLM model).
+
+    closed    -> calls go through; too many recent failures open the circuit
+    open      -> calls are rejected immediately for CIRCUIT_OPEN_SECONDS
+    half_open -> a single probe call is let through; success closes the
+                 circuit, failure opens it again
+
+    Only used from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+        self._outcomes = deque(maxlen=max(1, CIRCUIT_WINDOW_SIZE))
+        self._latencies = deque(maxlen=max(1, CIRCUIT_WINDOW_SIZE))
+        self._stats = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    # ---------- state ----------
+    def _refresh(self):
+        if self.state == OPEN and time.monotonic() - self.opened_at >= CIRCUIT_OPEN_SECONDS:
+            self.state = HALF_OPEN
+            self.probe_in_flight = False
+
+    def _blocked(self) -> bool:
+        self._refresh()
+        return self.state == OPEN or (self.state == HALF_OPEN and self.probe_in_flight)
+
+    def rejects(self) -> bool:
+        """
+        True (and counted as a rejected call) when a call would be rejected right
+        now, so callers can skip straight to their fallback. Does not reserve a probe.
+        """
+        if self._blocked():
+            self._stats["rejected"] += 1
+            return True
+        return False
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+        self._stats["opened"] += 1
+        print(f"Circuit '{self.name}' opened for {CIRCUIT_OPEN_SECONDS}s")
+
+    def _close(self):
+        self.state = CLOSED
+        self.probe_in_flight = False
+        self._outcomes.clear()
+        print(f"Circuit '{self.name}' closed")
+
+    # ---------- recording ----------
+    def record_success(self, latency: float):
+        if CIRCUIT_SLOW_CALL_SECONDS > 0 and latency > CIRCUIT_SLOW_CALL_SECONDS:
+            self.record_failure(latency)
+            return
+
+        self._stats["calls"] += 1
+        self._latencies.append(latency)
+
+        if self.state == HALF_OPEN:
+            self._close()
+        self._outcomes.append(False)
+
+    def record_failure(self, latency: Optional[float] = None):
+        self._stats["calls"] += 1
+        self._stats["failures"] += 1
+        if latency is not None:
+            self._latencies.append(latency)
+
+        if self.state == HALF_OPEN:
+            self._open()
+            return
+
+        self._outcomes.append(True)
+        failures = sum(self._outcomes)
+        if (
+            self.state == CLOSED
+            and len(self._outcomes) >= CIRCUIT_MIN_CALLS
+            and failures / len(self._outcomes) >= CIRCUIT_FAILURE_RATE
+        ):
+            self._open()
+
+    @contextmanager
+    def guard(self):
+        """
+        Wrap one call: raises CircuitOpenError instead of entering when the
+        circuit is open, otherwise records the call's outcome and latency.
+        Cancellation (client gone, shutdown) is not counted as a failure.
+        """
+        if self.rejects():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+
+        probe = self.state == HALF_OPEN
+        if probe:
+            self.probe_in_flight = True
+
+        start = time.monotonic()
+        try:
+            yield
+        except Exception:
+            self.record_failure(time.monotonic() - start)
+            raise
+        except BaseException:
+            if probe:
+                self.probe_in_flight = False
+            raise
+        else:
+            self.record_success(time.monotonic() - start)
+
+    # ---------- reporting ----------
+    def latency_percentile(self, fraction: float, min_samples: int = 1) -> Optional[float]:
+        """Recent latency percentile, or None with fewer than `min_samples` calls."""
+        if len(self._latencies) < max(1, min_samples):
+            return None
+        return _percentile(sorted(self._latencies), fraction)
+
+    def snapshot(self) -> dict:
+        self._refresh()
+        recent = len(self._outcomes)
+        latencies = sorted(self._latencies)
+
+        snapshot = {
+            "state": self.state,
+            "recent_calls": recent,
+            "recent_failure_rate": round(sum(self._outcomes) / recent, 4) if recent else 0.0,
+            "latency_p50_seconds": _percentile(latencies, 0.5),
+            "latency_p95_seconds": _percentile(latencies, 0.95),
+            **self._stats,
+        }
+        if self.state == OPEN:
+            snapshot["retry_in_seconds"] = round(
+                max(0.0, CIRCUIT_OPEN_SECONDS - (time.monotonic() - self.opened_at)), 1
+            )
+        return snapshot
+
+
+# --------------------------------------------------
+# REGISTRY
+# --------------------------------------------------
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name)
+    return breaker
+
+
+def reset_breakers():
+    _breakers.clear()
+
+
+def get_circuit_stats() -> dict:
+    return {
+        "failure_rate_threshold": CIRCUIT_FAILURE_RATE,
+        "window_size": CIRCUIT_WINDOW_SIZE,
+        "open_seconds": CIRCUIT_OPEN_SECONDS,
+        "circuits": {name: breaker.snapshot() for name, breaker in _breakers.items()},
+    }
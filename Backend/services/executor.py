@@ -0,0 +1,149 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Callable, Iterable, Optional
+
+import config.env  # noqa: F401  (loads .env before settings are read)
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+BLOCKING_WORKER_THREADS = int(os.getenv("BLOCKING_WORKER_THREADS", "16"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {
+    "queued": 0,
+    "running": 0,
+    "completed": 0,
+    "failed": 0,
+    "total_wait_seconds": 0.0,
+    "max_wait_seconds": 0.0,
+    "total_run_seconds": 0.0,
+}
+
+
+# --------------------------------------------------
+# EXECUTOR LIFECYCLE
+# --------------------------------------------------
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, BLOCKING_WORKER_THREADS),
+                    thread_name_prefix="blocking-worker",
+                )
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+# --------------------------------------------------
+# RUN BLOCKING CALLS
+# --------------------------------------------------
+def _run_tracked(func: Callable, submitted_at: float):
+    started_at = time.perf_counter()
+    wait = started_at - submitted_at
+
+    with _stats_lock:
+        _stats["queued"] -= 1
+        _stats["running"] += 1
+        _stats["total_wait_seconds"] += wait
+        _stats["max_wait_seconds"] = max(_stats["max_wait_seconds"], wait)
+
+    failed = False
+    try:
+        return func()
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        with _stats_lock:
+            _stats["running"] -= 1
+            _stats["completed" if not failed else "failed"] += 1
+            _stats["total_run_seconds"] += time.perf_counter() - started_at
+
+
+async def run_blocking(func: Callable, *args, **kwargs):
+    """
+    Run a blocking function (sqlite3, Firebase Admin, ...) on the shared worker pool
+    so the event loop stays free for other requests.
+    """
+    with _stats_lock:
+        _stats["queued"] += 1
+
+    call = partial(func, *args, **kwargs)
+    future = get_executor().submit(_run_tracked, call, time.perf_counter())
+    future.add_done_callback(_discount_cancelled)
+    return await asyncio.wrap_future(future)
+
+
+_EXHAUSTED = object()
+
+
+async def iterate_blocking(iterable: Iterable) -> AsyncIterator:
+    """
+    Async iterator over a blocking iterable (e.g. a generator reading sqlite3):
+    each next() runs on the shared worker pool through run_blocking, so
+    streamed responses are counted in the pool stats like any other call.
+    """
+    iterator = iter(iterable)
+    try:
+        while True:
+            item = await run_blocking(next, iterator, _EXHAUSTED)
+            if item is _EXHAUSTED:
+                return
+            yield item
+    finally:
+        # Client went away mid-stream: run the generator's cleanup now
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            try:
+                close()
+            except ValueError:
+                # Still running on a worker (the await was cancelled); it
+                # is closed when garbage collected instead
+                pass
+
+
+def _discount_cancelled(future):
+    # A call cancelled before a worker picked it up never reaches _run_tracked
+    if future.cancelled():
+        with _stats_lock:
+            _stats["queued"] -= 1
+
+
+def get_executor_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+
+    finished = stats["completed"] + stats["failed"]
+    started = finished + stats["running"]
+
+    return {
+        "max_workers": BLOCKING_WORKER_THREADS,
+        "queue_depth": stats["queued"],
+        "running": stats["running"],
+        "completed": stats["completed"],
+        "failed": stats["failed"],
+        "avg_wait_ms": round(stats["total_wait_seconds"] / started * 1000, 3)
+        if started
+        else 0.0,
+        "max_wait_ms": round(stats["max_wait_seconds"] * 1000, 3),
+        "avg_run_ms": round(stats["total_run_seconds"] / finished * 1000, 3)
+        if finished
+        else 0.0,
+    }
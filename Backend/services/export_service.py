@@ -1,39 +1,87 @@
-def generate_itinerary_markdown(itinerary: dict) -> str:
+import json
+import os
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import quote
+
+import config.env  # noqa: F401  (loads .env before settings are read)
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+# Rendered exports kept in memory, keyed by itinerary id + updated_at + format.
+# Exports larger than EXPORT_CACHE_MAX_ENTRY_BYTES are streamed but not cached.
+EXPORT_CACHE_MAX_ENTRIES = int(os.getenv("EXPORT_CACHE_MAX_ENTRIES", "256"))
+EXPORT_CACHE_MAX_ENTRY_BYTES = int(
+    os.getenv("EXPORT_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024))
+)
+
+# Rendered text is sent in chunks of about this size
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+Renderer = Callable[[dict], Iterator[str]]
+
+
+# --------------------------------------------------
+# EXPORT PAYLOAD
+# --------------------------------------------------
+def build_export_payload(itinerary: dict) -> dict:
+    """Shape a stored itinerary (get_itinerary_by_id) for the renderers."""
+    return {
+        "id": itinerary["id"],
+        "destination": itinerary["destination"],
+        "start_date": itinerary["start_date"],
+        "end_date": itinerary["end_date"],
+        "preferences": itinerary["preferences"],
+        "itinerary_data": itinerary["itinerary"],
+        "updated_at": itinerary["updated_at"],
+    }
+
+
+# --------------------------------------------------
+# MARKDOWN
+# --------------------------------------------------
+def iter_itinerary_markdown(itinerary: dict) -> Iterator[str]:
     """
-    Converts itinerary data into a well-structured Markdown document.
+    Yields the Markdown document section by section.
     """
 
     # --------------------------------------------------
     # Header
     # --------------------------------------------------
-    md = f"# 🌍 Travel Itinerary: {itinerary.get('destination', 'My Trip')}\n\n"
+    yield f"# 🌍 Travel Itinerary: {itinerary.get('destination', 'My Trip')}\n\n"
 
     # --------------------------------------------------
     # Trip Overview
     # --------------------------------------------------
-    md += "## ✈️ Trip Overview\n"
-    md += f"- **Destination:** {itinerary.get('destination', '-')}\n"
+    md = ["## ✈️ Trip Overview\n", f"- **Destination:** {itinerary.get('destination', '-')}\n"]
 
     if itinerary.get("start_date") and itinerary.get("end_date"):
-        md += f"- **Dates:** {itinerary['start_date']} → {itinerary['end_date']}\n"
+        md.append(f"- **Dates:** {itinerary['start_date']} → {itinerary['end_date']}\n")
 
-    md += "\n"
+    md.append("\n")
+    yield "".join(md)
 
     # --------------------------------------------------
     # Preferences
     # --------------------------------------------------
     preferences = itinerary.get("preferences", {})
     if preferences:
-        md += "## 🎯 Preferences\n"
+        md = ["## 🎯 Preferences\n"]
         for key, value in preferences.items():
             if value:
                 label = key.replace("_", " ").title()
                 if isinstance(value, list):
                     value = ", ".join(value)
-                md += f"- **{label}:** {value}\n"
-        md += "\n"
+                md.append(f"- **{label}:** {value}\n")
+        md.append("\n")
+        yield "".join(md)
 
-    md += "---\n\n"
+    yield "---\n\n"
 
     # --------------------------------------------------
     # AI Overview (optional but recommended)
@@ -41,9 +89,7 @@ def generate_itinerary_markdown(itinerary: dict) -> str:
     ai_itinerary = itinerary.get("itinerary_data", {})
     overview = ai_itinerary.get("overview")
     if overview:
-        md += "## 🧭 Trip Summary\n"
-        md += f"{overview}\n\n"
-        md += "---\n\n"
+        yield f"## 🧭 Trip Summary\n{overview}\n\n---\n\n"
 
     # --------------------------------------------------
     # Daily Breakdown
@@ -51,28 +97,373 @@ def generate_itinerary_markdown(itinerary: dict) -> str:
     days = ai_itinerary.get("days", [])
 
     for day in days:
-        md += f"## 📅 Day {day.get('day', '')}: {day.get('title', '')}\n\n"
+        md = [f"## 📅 Day {day.get('day', '')}: {day.get('title', '')}\n\n"]
 
         if day.get("morning"):
-            md += f"### 🌅 Morning\n{day['morning']}\n\n"
+            md.append(f"### 🌅 Morning\n{day['morning']}\n\n")
 
         if day.get("afternoon"):
-            md += f"### 🌞 Afternoon\n{day['afternoon']}\n\n"
+            md.append(f"### 🌞 Afternoon\n{day['afternoon']}\n\n")
 
         if day.get("evening"):
-            md += f"### 🌆 Evening\n{day['evening']}\n\n"
+            md.append(f"### 🌆 Evening\n{day['evening']}\n\n")
 
         if day.get("food"):
-            md += f"### 🍽️ Food Recommendations\n{day['food']}\n\n"
+            md.append(f"### 🍽️ Food Recommendations\n{day['food']}\n\n")
 
         if day.get("notes"):
-            md += f"### 📝 Notes\n{day['notes']}\n\n"
+            md.append(f"### 📝 Notes\n{day['notes']}\n\n")
 
-        md += "---\n\n"
+        md.append("---\n\n")
+        yield "".join(md)
 
     # --------------------------------------------------
     # Footer
     # --------------------------------------------------
-    md += "*Generated by **Nisha Travel AI*** ✨\n"
+    yield "*Generated by **Nisha Travel AI*** ✨\n"
+
+
+def generate_itinerary_markdown(itinerary: dict) -> str:
+    """
+    Converts itinerary data into a well-structured Markdown document.
+    """
+    return "".join(iter_itinerary_markdown(itinerary))
+
+
+# --------------------------------------------------
+# JSON
+# --------------------------------------------------
+_json_encoder = json.JSONEncoder(ensure_ascii=False, indent=2, default=str)
+
+
+def iter_itinerary_json(itinerary: dict) -> Iterator[str]:
+    yield from _json_encoder.iterencode(itinerary)
+    yield "\n"
+
+
+# --------------------------------------------------
+# ICS CALENDAR
+# --------------------------------------------------
+# One all-day event per itinerary day, dated from the trip's start date
+def _ics_escape(value) -> str:
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _ics_line(line: str) -> str:
+    """Fold a content line at 75 octets (RFC 5545), never inside a UTF-8 character."""
+    if len(line.encode("utf-8")) <= 75:
+        return line + "\r\n"
+
+    parts = []
+    current = []
+    size = 0
+    limit = 75
+    for ch in line:
+        width = len(ch.encode("utf-8"))
+        if size + width > limit:
+            parts.append("".join(current))
+            current = []
+            size = 0
+            limit = 74  # continuation lines start with a space
+        current.append(ch)
+        size += width
+    parts.append("".join(current))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _parse_date(value) -> Optional[date]:
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _ics_timestamp(value) -> str:
+    try:
+        stamp = datetime.fromisoformat(str(value))
+    except ValueError:
+        stamp = datetime.now(timezone.utc)
+    # Stored timestamps are UTC; older rows have no offset
+    if stamp.tzinfo is not None:
+        stamp = stamp.astimezone(timezone.utc)
+    return stamp.strftime("%Y%m%dT%H%M%SZ")
+
+
+def iter_itinerary_ics(itinerary: dict) -> Iterator[str]:
+    destination = itinerary.get("destination") or "My Trip"
+    start = _parse_date(itinerary.get("start_date"))
+    stamp = _ics_timestamp(itinerary.get("updated_at"))
+
+    yield "".join(
+        _ics_line(line)
+        for line in (
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            "PRODID:-//Nisha Travel AI//Itinerary Export//EN",
+            "CALSCALE:GREGORIAN",
+            f"X-WR-CALNAME:{_ics_escape(f'Travel Itinerary: {destination}')}",
+        )
+    )
+
+    days = (itinerary.get("itinerary_data") or {}).get("days", [])
+    for index, day in enumerate(days):
+        if start is None:
+            break
+
+        number = day.get("day")
+        if not isinstance(number, int) or isinstance(number, bool):
+            number = index + 1
+        day_date = start + timedelta(days=number - 1)
+
+        description = "\n\n".join(
+            f"{label}: {day[field]}"
+            for field, label in (
+                ("morning", "Morning"),
+                ("afternoon", "Afternoon"),
+                ("evening", "Evening"),
+                ("food", "Food"),
+                ("notes", "Notes"),
+            )
+            if day.get(field)
+        )
+
+        yield "".join(
+            _ics_line(line)
+            for line in (
+                "BEGIN:VEVENT",
+                f"UID:itinerary-{itinerary.get('id')}-day-{number}@nisha-travel-ai",
+                f"DTSTAMP:{stamp}",
+                f"DTSTART;VALUE=DATE:{day_date.strftime('%Y%m%d')}",
+                f"DTEND;VALUE=DATE:{(day_date + timedelta(days=1)).strftime('%Y%m%d')}",
+                f"SUMMARY:{_ics_escape(f'Day {number}: ' + str(day.get('title', '')))}",
+                f"LOCATION:{_ics_escape(destination)}",
+                f"DESCRIPTION:{_ics_escape(description)}",
+                "END:VEVENT",
+            )
+        )
+
+    yield _ics_line("END:VCALENDAR")
+
+
+# --------------------------------------------------
+# FORMATS
+# --------------------------------------------------
+# Format name -> renderer (payload -> text chunks), media type, file extension
+EXPORT_FORMATS: Dict[str, Tuple[Renderer, str, str]] = {
+    "markdown": (iter_itinerary_markdown, "text/markdown; charset=utf-8", "md"),
+    "json": (iter_itinerary_json, "application/json", "json"),
+    "ics": (iter_itinerary_ics, "text/calendar; charset=utf-8", "ics"),
+}
+
+
+def export_media_type(export_format: str) -> str:
+    return EXPORT_FORMATS[export_format][1]
+
+
+def export_filename(destination: str, export_format: str) -> str:
+    return f"{destination.replace(' ', '_')}_itinerary.{EXPORT_FORMATS[export_format][2]}"
+
+
+def content_disposition(filename: str) -> str:
+    """Attachment header; non-ASCII names go in filename* (RFC 6266) with an ASCII fallback."""
+    if filename.isascii():
+        return f"attachment; filename={filename}"
+
+    fallback = filename.encode("ascii", "replace").decode("ascii").replace("?", "_")
+    return f"attachment; filename={fallback}; filename*=UTF-8''{quote(filename)}"
+
+
+def _encode_chunks(chunks: Iterator[str]) -> Iterator[bytes]:
+    """UTF-8 encode renderer output, coalesced into EXPORT_CHUNK_BYTES pieces."""
+    buffer = []
+    size = 0
+    for chunk in chunks:
+        data = chunk.encode("utf-8")
+        buffer.append(data)
+        size += len(data)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+# --------------------------------------------------
+# RENDER CACHE
+# --------------------------------------------------
+class ExportCache:
+    """
+    LRU cache of rendered exports keyed by (itinerary id, updated_at, format).
+    Entries are (content, filename), so a hit needs nothing from the database.
+    """
+
+    def __init__(self, max_entries: int, max_entry_bytes: int):
+        self.max_entries = max_entries
+        self.max_entry_bytes = max_entry_bytes
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def get(self, key: tuple) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, content: bytes, filename: str):
+        if self.max_entries <= 0 or len(content) > self.max_entry_bytes:
+            return
+
+        with self._lock:
+            self._entries[key] = (content, filename)
+            self._entries.move_to_end(key)
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "bytes": sum(len(content) for content, _ in self._entries.values()),
+                "max_entries": self.max_entries,
+                "max_entry_bytes": self.max_entry_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+
+export_cache = ExportCache(EXPORT_CACHE_MAX_ENTRIES, EXPORT_CACHE_MAX_ENTRY_BYTES)
+
+
+def _cache_key(itinerary_id: int, updated_at, export_format: str) -> tuple:
+    return (itinerary_id, str(updated_at), export_format)
+
+
+def get_cached_export(
+    itinerary_id: int, updated_at, export_format: str
+) -> Optional[Tuple[bytes, str]]:
+    """(content, filename) of a previously rendered export, if still cached."""
+    return export_cache.get(_cache_key(itinerary_id, updated_at, export_format))
+
+
+def stream_export(itinerary: dict, export_format: str) -> Iterator[bytes]:
+    """
+    Render a stored itinerary chunk by chunk. The rendered bytes are cached once
+    the whole export has been produced, unless it outgrows the per-entry limit.
+    """
+    render = EXPORT_FORMATS[export_format][0]
+    key = _cache_key(itinerary["id"], itinerary["updated_at"], export_format)
+
+    kept = []
+    size = 0
+    for chunk in _encode_chunks(render(build_export_payload(itinerary))):
+        if kept is not None:
+            size += len(chunk)
+            if size <= export_cache.max_entry_bytes:
+                kept.append(chunk)
+            else:
+                kept = None
+        yield chunk
+
+    if kept is not None:
+        filename = export_filename(itinerary["destination"], export_format)
+        export_cache.put(key, b"".join(kept), filename)
+
+
+# --------------------------------------------------
+# ZIP ARCHIVE OF ALL ITINERARIES
+# --------------------------------------------------
+class _ZipOutput:
+    """
+    Write-only file for zipfile. It has no seek/tell, so zipfile writes each
+    entry followed by a data descriptor instead of seeking back to patch the
+    header, and the written bytes can be handed out as soon as they exist.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self.size = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        self.size = 0
+        return data
+
+
+def _archive_entry(itinerary: dict) -> zipfile.ZipInfo:
+    destination = re.sub(r"[^\w.-]+", "_", itinerary.get("destination") or "trip")
+    info = zipfile.ZipInfo(f"{itinerary['id']}_{destination}_itinerary.md")
+
+    try:
+        stamp = datetime.fromisoformat(str(itinerary.get("updated_at")))
+        info.date_time = stamp.timetuple()[:6]
+    except ValueError:
+        pass
+
+    info.compress_type = zipfile.ZIP_DEFLATED
+    return info
+
+
+def stream_itineraries_zip(itineraries: Iterable[dict]) -> Iterator[bytes]:
+    """
+    ZIP archive with one Markdown file per itinerary, produced as it is read:
+    memory use stays around EXPORT_CHUNK_BYTES however many trips there are.
+    """
+    output = _ZipOutput()
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for itinerary in itineraries:
+            markdown = iter_itinerary_markdown(build_export_payload(itinerary))
+            with archive.open(_archive_entry(itinerary), "w") as entry:
+                for chunk in _encode_chunks(markdown):
+                    entry.write(chunk)
+                    if output.size >= EXPORT_CHUNK_BYTES:
+                        yield output.drain()
+
+            if output.size >= EXPORT_CHUNK_BYTES:
+                yield output.drain()
+
+    # Remaining entries and the central directory
+    yield output.drain()
+
 
-    return md
+def get_export_cache_stats() -> dict:
+    return export_cache.stats()
@@ -0,0 +1,255 @@
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# --------------------------------------------------
+# DECLARATIVE KEYWORD RULES
+# --------------------------------------------------
+# The smart fallback (used when the chat LLM is unavailable) is driven by rule
+# tables instead of inline code. A rule matches when any of its (lowercase)
+# keywords occurs in the field; on strings this short plain `in` checks
+# measured faster than compiled patterns, whether one per rule or one per field
+# with a group per rule. A day field is lowercased once no matter how many
+# rules test it.
+#
+# A field's rules run in one of two modes:
+#   "first" - if/elif/else: the first rule whose keywords match applies, a rule
+#             without keywords is the else branch
+#   "each"  - independent ifs: every matching rule applies in order, and later
+#             rules see the value written by earlier ones
+
+DayAction = Callable[[dict, str], str]
+RuleSpec = Tuple[Optional[Iterable[str]], DayAction]
+
+
+class DayRuleSet:
+    """Ordered keyword rules that transform one itinerary day."""
+
+    def __init__(self, fields: List[Tuple[str, str, List[RuleSpec]]]):
+        self.fields = []
+        for field, mode, rules in fields:
+            if mode not in ("first", "each"):
+                raise ValueError(f"Unknown rule mode: {mode!r}")
+
+            compiled = tuple(
+                (tuple(k.lower() for k in keywords) if keywords else None, action)
+                for keywords, action in rules
+            )
+            self.fields.append((field, mode == "first", compiled))
+
+    def apply(self, day: dict, destination: str) -> dict:
+        updated = dict(day)
+
+        for field, first_match_only, rules in self.fields:
+            text = None
+            for keywords, action in rules:
+                if keywords is not None:
+                    if text is None:
+                        text = updated.get(field, "").lower()
+                    for keyword in keywords:
+                        if keyword in text:
+                            break
+                    else:
+                        continue
+
+                updated[field] = action(updated, destination)
+                if first_match_only:
+                    break
+                text = None
+
+        return updated
+
+
+# --------------------------------------------------
+# DAY TRANSFORMATIONS
+# --------------------------------------------------
+LUXURY_RULES = DayRuleSet(
+    [
+        (
+            "morning",
+            "each",
+            [
+                (
+                    ["hotel", "check-in"],
+                    lambda day, destination: day["morning"]
+                    .replace("hotel", "luxury 5-star hotel")
+                    .replace("check-in", "VIP check-in at luxury resort"),
+                ),
+                (
+                    ["walk", "explore"],
+                    lambda day, destination: f"Private guided tour of {destination}'s exclusive morning spots with luxury transport",
+                ),
+                (
+                    ["market"],
+                    lambda day, destination: f"Private shopping experience at {destination}'s high-end boutiques with personal shopper",
+                ),
+            ],
+        ),
+        (
+            "afternoon",
+            "first",
+            [
+                (
+                    ["museum", "tour"],
+                    lambda day, destination: "Private VIP museum tour with expert guide, skip-the-line access",
+                ),
+                (
+                    ["beach", "relax"],
+                    lambda day, destination: "Private beach cabana with butler service and premium amenities",
+                ),
+                (
+                    ["sightsee", "visit"],
+                    lambda day, destination: f"Luxury private car tour of {destination}'s landmarks with champagne service",
+                ),
+                (
+                    None,
+                    lambda day, destination: f"Exclusive high-end experience: {day.get('afternoon', 'Leisure time')} with premium service",
+                ),
+            ],
+        ),
+        (
+            "evening",
+            "first",
+            [
+                (
+                    ["dinner", "restaurant"],
+                    lambda day, destination: f"Michelin-starred dinner experience at {destination}'s finest restaurant with wine pairing",
+                ),
+                (
+                    ["show", "entertainment"],
+                    lambda day, destination: "VIP box seats at premium show with backstage access and champagne",
+                ),
+                (
+                    None,
+                    lambda day, destination: "Sunset cocktail reception at luxury rooftop bar followed by gourmet dining",
+                ),
+            ],
+        ),
+        (
+            "food",
+            "first",
+            [
+                (
+                    ["local", "street"],
+                    lambda day, destination: "Fine dining: "
+                    + day["food"]
+                    .replace("street food", "gourmet cuisine")
+                    .replace("local", "premium local"),
+                ),
+                (
+                    None,
+                    lambda day, destination: f"Gourmet dining experience: {day.get('food', ' chef tasting menu')}",
+                ),
+            ],
+        ),
+        (
+            "notes",
+            "first",
+            [
+                (
+                    None,
+                    lambda day, destination: f"All bookings include VIP service and premium transfers. {day['notes']}"
+                    if day.get("notes")
+                    else "Includes private transfers, priority access, and concierge service",
+                ),
+            ],
+        ),
+    ]
+)
+
+BUDGET_RULES = DayRuleSet(
+    [
+        (
+            "morning",
+            "each",
+            [
+                (
+                    ["luxury", "private"],
+                    lambda day, destination: day["morning"]
+                    .replace("luxury", "comfortable")
+                    .replace("private", "self-guided"),
+                ),
+                (
+                    ["tour"],
+                    lambda day, destination: f"Self-guided walking tour of {destination} using free map app",
+                ),
+            ],
+        ),
+        (
+            "afternoon",
+            "each",
+            [
+                (
+                    ["vip", "private"],
+                    lambda day, destination: day["afternoon"]
+                    .replace("VIP", "Standard")
+                    .replace("private", "group"),
+                ),
+                (
+                    ["car", "transport"],
+                    lambda day, destination: f"Public transport exploration of {destination} (buy day pass)",
+                ),
+            ],
+        ),
+        (
+            "evening",
+            "first",
+            [
+                (
+                    ["michelin", "fine dining"],
+                    lambda day, destination: "Casual dinner at highly-rated local eatery or food market",
+                ),
+            ],
+        ),
+        (
+            "food",
+            "first",
+            [
+                (
+                    None,
+                    lambda day, destination: f"Budget-friendly: {day.get('food', 'local street food and markets')}",
+                ),
+            ],
+        ),
+        (
+            "notes",
+            "first",
+            [
+                (
+                    None,
+                    lambda day, destination: "Budget travel tips: Use public transport, book attractions online for discounts",
+                ),
+            ],
+        ),
+    ]
+)
+
+
+# --------------------------------------------------
+# MESSAGE INTENTS
+# --------------------------------------------------
+# Intent name -> keywords; an intent is present when any keyword occurs in the
+# lowercased chat message
+INTENT_KEYWORDS: Dict[str, List[str]] = {
+    "add_day": ["add day", "extend trip", "one more day", "extra day", "additional day"],
+    "relax": ["relax"],
+    "relaxing": ["relax", "slow"],
+    "luxury_day": ["luxury", "high"],
+    "accordingly": ["accordingly", "update"],
+    "budget_change": ["budget", "luxury"],
+    "upgrade": ["high", "luxury", "expensive", "upgrade"],
+    "downgrade": ["low", "cheap", "budget", "save"],
+}
+
+_INTENT_KEYWORDS = tuple(
+    (name, tuple(k.lower() for k in words)) for name, words in INTENT_KEYWORDS.items()
+)
+
+ADD_DAY_NUMBER_PATTERN = re.compile(r"day\s*(\d+)")
+MODIFY_DAY_PATTERN = re.compile(r"(?:update|modify|change)\s+day\s*(\d+)")
+
+
+def detect_intents(message_lower: str) -> Dict[str, bool]:
+    return {
+        name: any(keyword in message_lower for keyword in keywords)
+        for name, keywords in _INTENT_KEYWORDS
+    }
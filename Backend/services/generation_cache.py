@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date
+from typing import Optional
+
+import config.env  # noqa: F401  (loads .env before settings are read)
+from database.database import get_db_connection
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+GENERATION_CACHE_TTL_SECONDS = float(
+    os.getenv("GENERATION_CACHE_TTL_SECONDS", str(7 * 24 * 3600))
+)
+GENERATION_CACHE_MAX_ENTRIES = int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "1000"))
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+
+def _count(name: str, amount: int = 1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+# --------------------------------------------------
+# CACHE KEY
+# --------------------------------------------------
+def _normalize_text(value) -> str:
+    return " ".join(str(value or "").lower().split())
+
+
+def _normalize_list(values) -> list:
+    return sorted({_normalize_text(v) for v in values or [] if _normalize_text(v)})
+
+
+def _trip_length(start_date: str, end_date: str):
+    """Number of days in the trip, or the raw dates if they are not ISO formatted."""
+    try:
+        start = date.fromisoformat(str(start_date)[:10])
+        end = date.fromisoformat(str(end_date)[:10])
+        return (end - start).days + 1
+    except ValueError:
+        return [start_date, end_date]
+
+
+def make_cache_key(preferences: dict) -> str:
+    """
+    Key for a TravelPreferenceRequest payload. Requests that differ only in
+    casing, whitespace, list order or absolute dates (same trip length) share a key.
+    """
+    normalized = {
+        "destination": _normalize_text(preferences.get("destination")),
+        "trip_length": _trip_length(
+            preferences.get("start_date"), preferences.get("end_date")
+        ),
+        "travel_style": _normalize_text(preferences.get("travel_style")),
+        "food_preferences": _normalize_list(preferences.get("food_preferences")),
+        "interests": _normalize_list(preferences.get("interests")),
+        "budget": _normalize_text(preferences.get("budget")),
+        "group_size": preferences.get("group_size"),
+        "special_requirements": _normalize_text(
+            preferences.get("special_requirements")
+        ),
+    }
+    payload = json.dumps(normalized, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# --------------------------------------------------
+# READ / WRITE
+# --------------------------------------------------
+def get_cached_itinerary(cache_key: str) -> Optional[dict]:
+    if GENERATION_CACHE_MAX_ENTRIES <= 0:
+        return None
+
+    now = time.time()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            "SELECT itinerary, created_at FROM generation_cache WHERE cache_key = ?",
+            (cache_key,),
+        )
+        row = cursor.fetchone()
+
+        if not row:
+            _count("misses")
+            return None
+
+        if now - row[1] > GENERATION_CACHE_TTL_SECONDS:
+            cursor.execute(
+                "DELETE FROM generation_cache WHERE cache_key = ?", (cache_key,)
+            )
+            conn.commit()
+            _count("misses")
+            _count("evictions")
+            return None
+
+        cursor.execute(
+            """
+            UPDATE generation_cache
+            SET last_used_at = ?, hits = hits + 1
+            WHERE cache_key = ?
+            """,
+            (now, cache_key),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    _count("hits")
+    return json.loads(row[0])
+
+
+def store_cached_itinerary(cache_key: str, itinerary: dict):
+    if GENERATION_CACHE_MAX_ENTRIES <= 0:
+        return
+
+    now = time.time()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO generation_cache (
+                cache_key, itinerary, created_at, last_used_at, hits
+            )
+            VALUES (?, ?, ?, ?, 0)
+            """,
+            (cache_key, json.dumps(itinerary), now, now),
+        )
+
+        # Drop expired entries, then the least recently used beyond the size limit
+        cursor.execute(
+            "DELETE FROM generation_cache WHERE created_at < ?",
+            (now - GENERATION_CACHE_TTL_SECONDS,),
+        )
+        evicted = cursor.rowcount
+        cursor.execute(
+            """
+            DELETE FROM generation_cache
+            WHERE cache_key IN (
+                SELECT cache_key FROM generation_cache
+                ORDER BY last_used_at DESC
+                LIMIT -1 OFFSET ?
+            )
+            """,
+            (GENERATION_CACHE_MAX_ENTRIES,),
+        )
+        evicted += cursor.rowcount
+
+        conn.commit()
+    finally:
+        conn.close()
+
+    _count("stores")
+    _count("evictions", evicted)
+
+
+def get_generation_cache_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    stats["ttl_seconds"] = GENERATION_CACHE_TTL_SECONDS
+    stats["max_entries"] = GENERATION_CACHE_MAX_ENTRIES
+    return stats
@@ -0,0 +1,46 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Response
+
+# --------------------------------------------------
+# CONDITIONAL GET HELPERS
+# --------------------------------------------------
+# Responses are per user (Firebase bearer token), so shared caches must not
+# store them; browsers may keep a copy but have to revalidate it every time.
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """
+    Weak ETag for a representation identified by `parts` (id, version, format...).
+    The tag is derived from the data version, not the bytes sent: GZipMiddleware
+    may compress the same body differently per request, so it cannot be strong.
+    """
+    payload = "\x1f".join(str(part) for part in parts)
+    return 'W/"' + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def _opaque_tag(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, so W/ prefixes are ignored on both sides)."""
+    if not if_none_match:
+        return False
+
+    etag = _opaque_tag(etag)
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or _opaque_tag(candidate) == etag:
+            return True
+    return False
+
+
+def cache_headers(etag: str, cache_control: str = PRIVATE_REVALIDATE) -> dict:
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def not_modified(etag: str, cache_control: str = PRIVATE_REVALIDATE) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, cache_control))
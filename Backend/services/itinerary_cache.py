@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import config.env  # noqa: F401  (loads .env before settings are read)
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+ITINERARY_CACHE_SIZE = int(os.getenv("ITINERARY_CACHE_SIZE", "500"))
+
+# Writes through this process invalidate entries immediately; the TTL bounds
+# how stale an entry can get when another process writes to the same database
+ITINERARY_CACHE_TTL_SECONDS = float(os.getenv("ITINERARY_CACHE_TTL_SECONDS", "300"))
+
+
+# --------------------------------------------------
+# DECODED ITINERARY CACHE
+# --------------------------------------------------
+class ItineraryCache:
+    """
+    LRU cache of get_itinerary_by_id() records (JSON already decoded, days
+    assembled) keyed by itinerary id. Cached records are shared between
+    callers and must be treated as read-only.
+
+    A read that raced with a write must not put the old record back after the
+    write invalidated it: callers take a token() before reading the database,
+    and put() drops the record if anything was invalidated since.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, itinerary_id: int) -> Optional[Dict]:
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(itinerary_id)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            record, expires_at = entry
+            if expires_at <= now:
+                del self._entries[itinerary_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(itinerary_id)
+            self.hits += 1
+            return record
+
+    def token(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def put(self, itinerary_id: int, record: Dict, token: int):
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            if token != self._generation:
+                return
+
+            self._entries[itinerary_id] = (record, time.time() + self.ttl_seconds)
+            self._entries.move_to_end(itinerary_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, itinerary_id: int):
+        """Call after the write has been committed."""
+        with self._lock:
+            self._generation += 1
+            if self._entries.pop(itinerary_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+itinerary_cache = ItineraryCache(ITINERARY_CACHE_SIZE, ITINERARY_CACHE_TTL_SECONDS)
+
+
+def get_itinerary_cache_stats() -> dict:
+    return itinerary_cache.stats()
@@ -0,0 +1,121 @@
+import copy
+from typing import Dict, List, Tuple
+
+# --------------------------------------------------
+# DAY-LEVEL ITINERARY PATCHES
+# --------------------------------------------------
+# In patch mode the chat LLM returns only the operations needed for a request
+# instead of the whole itinerary. Day numbers refer to the itinerary as it is
+# when the operation is applied (operations run in order), and days are
+# renumbered 1..N once all operations have been applied.
+#
+#   {"op": "replace_day", "day": 2, "data": {"title": "...", "evening": "..."}}
+#   {"op": "insert_day", "after": 3, "data": {...}}      (after 0 = first day)
+#   {"op": "delete_day", "day": 4}
+#   {"op": "update_overview", "overview": "..."}
+#   {"op": "update_preferences", "preferences": {"budget": "high"}}
+
+DAY_FIELDS = ["title", "morning", "afternoon", "evening", "food", "notes"]
+
+OPERATIONS = {
+    "replace_day",
+    "insert_day",
+    "delete_day",
+    "update_overview",
+    "update_preferences",
+}
+
+
+class InvalidPatchError(ValueError):
+    pass
+
+
+def _day_index(operation: dict, key: str, days: List[dict], allow_zero=False) -> int:
+    number = operation.get(key)
+    if isinstance(number, str) and number.isdigit():
+        number = int(number)
+
+    lowest = 0 if allow_zero else 1
+    # bool is an int subclass: true would otherwise mean day 1
+    if (
+        isinstance(number, bool)
+        or not isinstance(number, int)
+        or not lowest <= number <= len(days)
+    ):
+        raise InvalidPatchError(f"{operation['op']}: invalid {key} {number!r}")
+    return number - 1
+
+
+def _day_data(operation: dict) -> dict:
+    data = operation.get("data")
+    if not isinstance(data, dict):
+        raise InvalidPatchError(f"{operation['op']}: 'data' must be an object")
+    return {k: v for k, v in data.items() if k != "day"}
+
+
+def apply_itinerary_operations(
+    itinerary: dict, preferences: dict, operations: List[Dict]
+) -> Tuple[dict, dict, List[int]]:
+    """
+    Validate and apply day-level operations without mutating the inputs.
+    Returns (updated_itinerary, updated_preferences, changed_day_numbers).
+    """
+    if not isinstance(operations, list):
+        raise InvalidPatchError("'operations' must be a list")
+
+    updated_itinerary = copy.deepcopy(itinerary)
+    updated_preferences = copy.deepcopy(preferences)
+
+    days = updated_itinerary.get("days")
+    if not isinstance(days, list):
+        days = []
+    updated_itinerary["days"] = days
+
+    # Track day identities so changed days can be reported after renumbering
+    original_numbers = {id(day): i + 1 for i, day in enumerate(days)}
+    touched = set()
+
+    for operation in operations:
+        if not isinstance(operation, dict) or operation.get("op") not in OPERATIONS:
+            raise InvalidPatchError(f"Unknown operation: {operation!r}")
+
+        op = operation["op"]
+
+        if op == "replace_day":
+            index = _day_index(operation, "day", days)
+            days[index] = {**days[index], **_day_data(operation)}
+            touched.add(id(days[index]))
+
+        elif op == "insert_day":
+            index = _day_index(operation, "after", days, allow_zero=True) + 1
+            new_day = _day_data(operation)
+            days.insert(index, new_day)
+            touched.add(id(new_day))
+
+        elif op == "delete_day":
+            index = _day_index(operation, "day", days)
+            del days[index]
+
+        elif op == "update_overview":
+            overview = operation.get("overview")
+            if not isinstance(overview, str):
+                raise InvalidPatchError("update_overview: 'overview' must be a string")
+            updated_itinerary["overview"] = overview
+
+        elif op == "update_preferences":
+            changes = operation.get("preferences")
+            if not isinstance(changes, dict):
+                raise InvalidPatchError(
+                    "update_preferences: 'preferences' must be an object"
+                )
+            updated_preferences.update(changes)
+
+    changed_days = []
+    for i, day in enumerate(days):
+        day["day"] = i + 1
+        for field in DAY_FIELDS:
+            day.setdefault(field, "")
+        if id(day) in touched or original_numbers.get(id(day)) != i + 1:
+            changed_days.append(i + 1)
+
+    return updated_itinerary, updated_preferences, changed_days
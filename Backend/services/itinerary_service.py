@@ -1,13 +1,144 @@
-from database.database import get_db_connection
+import config.env  # noqa: F401  (loads .env before settings are read)
+from database.database import get_db_connection, utc_timestamp
+from services.circuit_breaker import CIRCUIT_SLOW_CALL_SECONDS, get_breaker
+from services.executor import run_blocking
+from services.itinerary_cache import itinerary_cache
+from services.itinerary_stream import IncrementalJSONParser
+from services.llm_json import LLMJSONError, load_model_json, validate_itinerary
+from services.llm_service import llm_slot, get_chat_model
+from services.model_ladder import CHAT_MODEL_LADDER, run_on_ladder, select_chat_models
+from services.fallback_rules import (
+    ADD_DAY_NUMBER_PATTERN,
+    BUDGET_RULES,
+    LUXURY_RULES,
+    MODIFY_DAY_PATTERN,
+    detect_intents,
+)
+from services.itinerary_patch import (
+    DAY_FIELDS,
+    InvalidPatchError,
+    apply_itinerary_operations,
+)
+import base64
 import json
-from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Dict, Iterator, List, Optional
 import os
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-import re
-import time
+from langchain_core.messages import HumanMessage
+
+
+# --------------------------------------------------
+# ITINERARY DAYS STORAGE
+# --------------------------------------------------
+# Days live in the itinerary_days table (one row per day, numbered 1..N);
+# itineraries.itinerary holds the rest of the plan (overview and any other keys).
+# Fields that are not plain text, and keys outside DAY_FIELDS, go to `extra`.
+
+
+def _split_itinerary(itinerary: dict):
+    """Return (itinerary without its days, list of days)."""
+    meta = {k: v for k, v in itinerary.items() if k != "days"}
+    days = itinerary.get("days")
+    return meta, days if isinstance(days, list) else []
+
+
+def _join_itinerary(meta: dict, days: List[Dict]) -> dict:
+    itinerary = dict(meta)
+    # Blobs the day migration could not split still carry their own days
+    if days or "days" not in meta:
+        itinerary["days"] = days
+    return itinerary
+
+
+def _day_row(itinerary_id: int, number: int, day) -> tuple:
+    day = day if isinstance(day, dict) else {}
+    columns, extra = [], {}
+    for field in DAY_FIELDS:
+        value = day.get(field)
+        if value is None or isinstance(value, str):
+            columns.append(value)
+        else:
+            columns.append(None)
+            extra[field] = value
+    extra.update((k, v) for k, v in day.items() if k != "day" and k not in DAY_FIELDS)
+
+    return (itinerary_id, number, *columns, json.dumps(extra) if extra else None)
+
+
+def _day_from_row(row) -> Dict:
+    day = {"day": row["day"]}
+    for field in DAY_FIELDS:
+        if row[field] is not None:
+            day[field] = row[field]
+    if row["extra"]:
+        day.update(json.loads(row["extra"]))
+    return day
+
+
+DAY_COLUMNS = ["itinerary_id", "day", *DAY_FIELDS, "extra"]
+
+
+def _day_columns(alias: str = "") -> str:
+    prefix = f"{alias}." if alias else ""
+    return ", ".join(prefix + column for column in DAY_COLUMNS)
+
+
+def _write_days(
+    cursor, itinerary_id: int, days: List[Dict], changed: Optional[List[int]] = None
+):
+    """
+    Store an itinerary's days. With `changed` (day numbers) only those rows are
+    written, plus removal of rows past the new last day; otherwise all are replaced.
+    """
+    if changed is None:
+        cursor.execute(
+            "DELETE FROM itinerary_days WHERE itinerary_id = ?", (itinerary_id,)
+        )
+        numbers = range(1, len(days) + 1)
+    else:
+        cursor.execute(
+            "DELETE FROM itinerary_days WHERE itinerary_id = ? AND day > ?",
+            (itinerary_id, len(days)),
+        )
+        numbers = sorted({n for n in changed if 1 <= n <= len(days)})
+
+    cursor.executemany(
+        f"""
+        INSERT OR REPLACE INTO itinerary_days ({_day_columns()})
+        VALUES ({", ".join("?" * len(DAY_COLUMNS))})
+        """,
+        [_day_row(itinerary_id, n, days[n - 1]) for n in numbers],
+    )
+
+
+def _load_days(cursor, itinerary_ids: List[int]) -> Dict[int, List[Dict]]:
+    days = {itinerary_id: [] for itinerary_id in itinerary_ids}
+    if not itinerary_ids:
+        return days
+
+    cursor.execute(
+        f"""
+        SELECT {_day_columns()}
+        FROM itinerary_days
+        WHERE itinerary_id IN ({", ".join("?" * len(itinerary_ids))})
+        ORDER BY itinerary_id, day
+        """,
+        list(itinerary_ids),
+    )
+    for row in cursor.fetchall():
+        days[row["itinerary_id"]].append(_day_from_row(row))
+    return days
+
+
+def changed_day_numbers(old_itinerary: dict, new_itinerary: dict) -> List[int]:
+    """Day numbers of new_itinerary that differ from old_itinerary."""
+    old_days = _split_itinerary(old_itinerary)[1]
+    new_days = _split_itinerary(new_itinerary)[1]
+    return [
+        i + 1
+        for i, day in enumerate(new_days)
+        if i >= len(old_days) or old_days[i] != day
+    ]
 
 
 # --------------------------------------------------
@@ -21,66 +152,41 @@ def save_itinerary(
     preferences: dict,
     itinerary: dict,
 ):
+    meta, days = _split_itinerary(itinerary)
+
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    cursor.execute("PRAGMA table_info(itineraries)")
-    columns = [col[1] for col in cursor.fetchall()]
-    has_updated_at = "updated_at" in columns
-
-    if has_updated_at:
-        cursor.execute(
-            """
-            INSERT INTO itineraries (
-                user_id,
-                destination,
-                start_date,
-                end_date,
-                preferences,
-                itinerary,
-                created_at,
-                updated_at
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                user_id,
-                destination,
-                start_date,
-                end_date,
-                json.dumps(preferences),
-                json.dumps(itinerary),
-                datetime.utcnow(),
-                datetime.utcnow(),
-            ),
-        )
-    else:
-        cursor.execute(
-            """
-            INSERT INTO itineraries (
-                user_id,
-                destination,
-                start_date,
-                end_date,
-                preferences,
-                itinerary,
-                created_at
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                user_id,
-                destination,
-                start_date,
-                end_date,
-                json.dumps(preferences),
-                json.dumps(itinerary),
-                datetime.utcnow(),
-            ),
+    now = utc_timestamp()
+    cursor.execute(
+        """
+        INSERT INTO itineraries (
+            user_id,
+            destination,
+            start_date,
+            end_date,
+            preferences,
+            itinerary,
+            created_at,
+            updated_at
         )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            user_id,
+            destination,
+            start_date,
+            end_date,
+            json.dumps(preferences),
+            json.dumps(meta),
+            now,
+            now,
+        ),
+    )
+    itinerary_id = cursor.lastrowid
+    _write_days(cursor, itinerary_id, days)
 
     conn.commit()
-    itinerary_id = cursor.lastrowid
     conn.close()
 
     return itinerary_id
@@ -110,6 +216,20 @@ def get_itineraries_by_user(user_email: str):
     )
 
     rows = cursor.fetchall()
+
+    days = {row[0]: [] for row in rows}
+    cursor.execute(
+        f"""
+        SELECT {_day_columns("d")}
+        FROM itinerary_days d
+        JOIN itineraries i ON i.id = d.itinerary_id
+        WHERE i.user_id = ?
+        ORDER BY d.itinerary_id, d.day
+        """,
+        (user_email,),
+    )
+    for day_row in cursor.fetchall():
+        days.setdefault(day_row["itinerary_id"], []).append(_day_from_row(day_row))
     conn.close()
 
     itineraries = []
@@ -121,7 +241,7 @@ def get_itineraries_by_user(user_email: str):
                 "destination": row[1],
                 "start_date": row[2],
                 "end_date": row[3],
-                "itinerary": json.loads(row[4]),
+                "itinerary": _join_itinerary(json.loads(row[4]), days[row[0]]),
                 "created_at": row[5],
             }
         )
@@ -129,84 +249,369 @@ def get_itineraries_by_user(user_email: str):
     return itineraries
 
 
+# Itineraries read per connection checkout while streaming an export
+EXPORT_BATCH_SIZE = max(1, int(os.getenv("EXPORT_BATCH_SIZE", "25")))
+
+
+def iter_user_itineraries(user_email: str) -> Iterator[Dict]:
+    """
+    Yield every itinerary of a user in full (same shape as get_itinerary_by_id),
+    newest first. Itineraries are read in keyset batches of EXPORT_BATCH_SIZE,
+    each on a connection that goes back to the pool before the batch is
+    yielded, so a slow download never holds a pooled connection.
+    """
+    last = None
+    while True:
+        where = "user_id = ?"
+        params = [user_email]
+        if last is not None:
+            where += " AND (created_at < ? OR (created_at = ? AND id < ?))"
+            params += [last[0], last[0], last[1]]
+        params.append(EXPORT_BATCH_SIZE)
+
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                SELECT
+                    id,
+                    destination,
+                    start_date,
+                    end_date,
+                    preferences,
+                    itinerary,
+                    created_at,
+                    updated_at
+                FROM itineraries
+                WHERE {where}
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+                """,
+                params,
+            )
+            rows = cursor.fetchall()
+            days = _load_days(cursor, [row["id"] for row in rows])
+        finally:
+            conn.close()
+
+        for row in rows:
+            yield _itinerary_from_export_row(row, days[row["id"]], user_email)
+
+        if len(rows) < EXPORT_BATCH_SIZE:
+            return
+        last = (rows[-1]["created_at"], rows[-1]["id"])
+
+
+def _itinerary_from_export_row(row, days: List[Dict], user_email: str) -> Dict:
+    return {
+        "id": row["id"],
+        "user_id": user_email,
+        "destination": row["destination"],
+        "start_date": row["start_date"],
+        "end_date": row["end_date"],
+        "preferences": json.loads(row["preferences"]),
+        "itinerary": _join_itinerary(json.loads(row["itinerary"]), days),
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+
+
+# --------------------------------------------------
+# PAGINATED ITINERARY LISTING
+# --------------------------------------------------
+OVERVIEW_SNIPPET_CHARS = 160
+
+
+def encode_page_cursor(created_at, itinerary_id: int) -> str:
+    raw = json.dumps([created_at, itinerary_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_page_cursor(cursor_token: str):
+    try:
+        created_at, itinerary_id = json.loads(
+            base64.urlsafe_b64decode(cursor_token.encode("ascii"))
+        )
+        return created_at, int(itinerary_id)
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+
+def get_itinerary_page(
+    user_email: str,
+    limit: int,
+    cursor_token: Optional[str] = None,
+    summary: bool = True,
+) -> Dict:
+    """
+    Keyset-paginated listing, newest first.
+    Summary rows carry a day count and overview snippet computed inside SQLite,
+    so neither the itinerary JSON nor its days are decoded in Python.
+    """
+    if summary:
+        columns = """
+            id,
+            destination,
+            start_date,
+            end_date,
+            created_at,
+            (
+                SELECT COUNT(*) FROM itinerary_days d
+                WHERE d.itinerary_id = itineraries.id
+            ) AS day_count,
+            substr(json_extract(itinerary, '$.overview'), 1, ?) AS overview
+        """
+        params = [OVERVIEW_SNIPPET_CHARS, user_email]
+    else:
+        columns = "id, destination, start_date, end_date, created_at, itinerary"
+        params = [user_email]
+
+    where = "user_id = ?"
+    if cursor_token:
+        created_at, last_id = decode_page_cursor(cursor_token)
+        where += " AND (created_at < ? OR (created_at = ? AND id < ?))"
+        params += [created_at, created_at, last_id]
+
+    # Fetch one extra row to know whether another page exists
+    params.append(limit + 1)
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""
+        SELECT {columns}
+        FROM itineraries
+        WHERE {where}
+        ORDER BY created_at DESC, id DESC
+        LIMIT ?
+        """,
+        params,
+    )
+    rows = cursor.fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    days = {} if summary else _load_days(cursor, [row["id"] for row in rows])
+    conn.close()
+
+    items = []
+    for row in rows:
+        item = {
+            "id": row["id"],
+            "destination": row["destination"],
+            "start_date": row["start_date"],
+            "end_date": row["end_date"],
+            "created_at": row["created_at"],
+        }
+        if summary:
+            item["day_count"] = row["day_count"] or 0
+            item["overview"] = row["overview"] or ""
+        else:
+            item["itinerary"] = _join_itinerary(
+                json.loads(row["itinerary"]), days[row["id"]]
+            )
+        items.append(item)
+
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_page_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+    return {"items": items, "next_cursor": next_cursor}
+
+
 # --------------------------------------------------
 # GET SINGLE ITINERARY BY ID (with ownership validation)
 # --------------------------------------------------
 def get_itinerary_by_id(itinerary_id: int, user_email: str):
+    """
+    Retrieve an itinerary (with ownership validation). Served from the
+    in-process itinerary cache when possible; the result must not be modified.
+    """
+    cached = itinerary_cache.get(itinerary_id)
+    if cached is not None:
+        return cached if cached["user_id"] == user_email else None
+
+    token = itinerary_cache.token()
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    cursor.execute("PRAGMA table_info(itineraries)")
-    columns = [col[1] for col in cursor.fetchall()]
-    has_updated_at = "updated_at" in columns
-
-    if has_updated_at:
-        cursor.execute(
-            """
-            SELECT
-                id,
-                user_id,
-                destination,
-                start_date,
-                end_date,
-                preferences,
-                itinerary,
-                created_at,
-                updated_at
-            FROM itineraries
-            WHERE id = ?
-            """,
-            (itinerary_id,),
-        )
-    else:
-        cursor.execute(
-            """
-            SELECT
-                id,
-                user_id,
-                destination,
-                start_date,
-                end_date,
-                preferences,
-                itinerary,
-                created_at
-            FROM itineraries
-            WHERE id = ?
-            """,
-            (itinerary_id,),
-        )
+    cursor.execute(
+        """
+        SELECT
+            id,
+            user_id,
+            destination,
+            start_date,
+            end_date,
+            preferences,
+            itinerary,
+            created_at,
+            updated_at
+        FROM itineraries
+        WHERE id = ?
+        """,
+        (itinerary_id,),
+    )
 
     row = cursor.fetchone()
-    conn.close()
 
-    if not row:
+    if not row or row[1] != user_email:
+        conn.close()
         return None
 
-    if row[1] != user_email:
-        return None
+    days = _load_days(cursor, [itinerary_id])[itinerary_id]
+    conn.close()
 
-    result = {
+    itinerary = {
         "id": row[0],
         "user_id": row[1],
         "destination": row[2],
         "start_date": row[3],
         "end_date": row[4],
         "preferences": json.loads(row[5]),
-        "itinerary": json.loads(row[6]),
+        "itinerary": _join_itinerary(json.loads(row[6]), days),
         "created_at": row[7],
+        "updated_at": row[8],
     }
+    itinerary_cache.put(itinerary_id, itinerary, token)
+    return itinerary
+
 
-    if has_updated_at:
-        result["updated_at"] = row[8]
+# --------------------------------------------------
+# VERSION LOOKUPS (CONDITIONAL GET)
+# --------------------------------------------------
+# Cheap queries identifying the current version of what a read endpoint would
+# return, so a client that already has it can get a 304 without the full read.
+def get_itinerary_version(itinerary_id: int, user_email: str) -> Optional[str]:
+    """
+    updated_at of an itinerary (with ownership validation), or None if it is
+    not found. Lets conditional requests be answered without loading the itinerary.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT user_id, updated_at FROM itineraries WHERE id = ?", (itinerary_id,)
+    )
+    row = cursor.fetchone()
+    conn.close()
+
+    if not row or row["user_id"] != user_email:
+        return None
+    return str(row["updated_at"])
+
+
+def get_itineraries_version(user_email: str) -> str:
+    """
+    Changes whenever one of the user's itineraries is created (count, max id),
+    edited (max updated_at; day edits bump it too) or deleted (count).
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT COUNT(*), MAX(id), MAX(updated_at)
+        FROM itineraries
+        WHERE user_id = ?
+        """,
+        (user_email,),
+    )
+    row = cursor.fetchone()
+    conn.close()
+
+    return f"{row[0]}:{row[1]}:{row[2]}"
+
+
+def get_chat_history_version(itinerary_id: int, user_email: str) -> Optional[str]:
+    """
+    Version of an itinerary's chat history (with ownership validation), or None
+    if the itinerary is not found. Messages are only ever appended.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT
+            user_id,
+            (SELECT COUNT(*) FROM chat_messages WHERE itinerary_id = i.id),
+            (SELECT MAX(id) FROM chat_messages WHERE itinerary_id = i.id)
+        FROM itineraries i
+        WHERE id = ?
+        """,
+        (itinerary_id,),
+    )
+    row = cursor.fetchone()
+    conn.close()
 
-    return result
+    if not row or row[0] != user_email:
+        return None
+    return f"{row[1]}:{row[2]}"
 
 
 # --------------------------------------------------
 # CHAT HISTORY FUNCTIONS
 # --------------------------------------------------
-def get_chat_history(itinerary_id: int) -> List[Dict]:
-    """Retrieve chat history for an itinerary"""
+# Messages quoted verbatim in the chat prompt, and how many earlier messages are
+# condensed into a one-line summary of previous requests
+CHAT_CONTEXT_MESSAGES = int(os.getenv("CHAT_CONTEXT_MESSAGES", "2"))
+CHAT_SUMMARY_MESSAGES = int(os.getenv("CHAT_SUMMARY_MESSAGES", "6"))
+
+# Messages returned to the client after a chat turn
+CHAT_RESPONSE_HISTORY_LIMIT = int(os.getenv("CHAT_RESPONSE_HISTORY_LIMIT", "50"))
+
+
+def get_chat_history_page(
+    itinerary_id: int, limit: int, before_id: Optional[int] = None
+) -> Dict:
+    """
+    Retrieve up to `limit` messages older than `before_id` (or the latest ones),
+    oldest first. `next_before_id` is set when older messages remain.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    params = [itinerary_id]
+    where = "itinerary_id = ?"
+    if before_id is not None:
+        where += " AND id < ?"
+        params.append(before_id)
+    params.append(limit + 1)
+
+    cursor.execute(
+        f"""
+        SELECT id, role, content, created_at
+        FROM chat_messages
+        WHERE {where}
+        ORDER BY id DESC
+        LIMIT ?
+        """,
+        params,
+    )
+
+    rows = cursor.fetchall()
+    conn.close()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    messages = []
+    for row in reversed(rows):
+        messages.append(
+            {"id": row[0], "role": row[1], "content": row[2], "created_at": row[3]}
+        )
+
+    return {
+        "items": messages,
+        "next_before_id": messages[0]["id"] if has_more and messages else None,
+    }
+
+
+def get_chat_history(itinerary_id: int, limit: Optional[int] = None) -> List[Dict]:
+    """Retrieve chat history for an itinerary (only the latest `limit` messages if given)"""
+    if limit is not None:
+        return get_chat_history_page(itinerary_id, limit)["items"]
+
     conn = get_db_connection()
     cursor = conn.cursor()
 
@@ -215,7 +620,7 @@ def get_chat_history(itinerary_id: int) -> List[Dict]:
         SELECT id, role, content, created_at
         FROM chat_messages
         WHERE itinerary_id = ?
-        ORDER BY created_at ASC
+        ORDER BY id ASC
         """,
         (itinerary_id,),
     )
@@ -232,56 +637,72 @@ def get_chat_history(itinerary_id: int) -> List[Dict]:
     return messages
 
 
-def save_chat_message(itinerary_id: int, role: str, content: str):
-    """Save a chat message to the database"""
+# --------------------------------------------------
+# SINGLE DAY READ / WRITE
+# --------------------------------------------------
+def get_itinerary_day(itinerary_id: int, user_email: str, day_number: int):
+    """Retrieve one day of an itinerary (with ownership validation)"""
     conn = get_db_connection()
     cursor = conn.cursor()
 
     cursor.execute(
-        """
-        INSERT INTO chat_messages (itinerary_id, role, content, created_at)
-        VALUES (?, ?, ?, ?)
+        f"""
+        SELECT {_day_columns("d")}
+        FROM itinerary_days d
+        JOIN itineraries i ON i.id = d.itinerary_id
+        WHERE d.itinerary_id = ? AND d.day = ? AND i.user_id = ?
         """,
-        (itinerary_id, role, content, datetime.utcnow()),
+        (itinerary_id, day_number, user_email),
     )
 
-    conn.commit()
-    message_id = cursor.lastrowid
+    row = cursor.fetchone()
     conn.close()
 
-    return message_id
+    return _day_from_row(row) if row else None
 
 
-def update_itinerary_data(itinerary_id: int, updated_itinerary: dict):
-    """Update the itinerary JSON and updated_at timestamp (if column exists)"""
+def update_itinerary_day(
+    itinerary_id: int, user_email: str, day_number: int, changes: dict
+):
+    """
+    Merge `changes` into one day and write only that row (plus updated_at).
+    Returns the updated day, or None if the itinerary or day does not exist.
+    """
     conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("PRAGMA table_info(itineraries)")
-    columns = [col[1] for col in cursor.fetchall()]
-    has_updated_at = "updated_at" in columns
 
-    if has_updated_at:
-        cursor.execute(
-            """
-            UPDATE itineraries
-            SET itinerary = ?, updated_at = ?
-            WHERE id = ?
-            """,
-            (json.dumps(updated_itinerary), datetime.utcnow(), itinerary_id),
-        )
-    else:
-        cursor.execute(
-            """
-            UPDATE itineraries
-            SET itinerary = ?
-            WHERE id = ?
-            """,
-            (json.dumps(updated_itinerary), itinerary_id),
-        )
+    try:
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                SELECT {_day_columns("d")}
+                FROM itinerary_days d
+                JOIN itineraries i ON i.id = d.itinerary_id
+                WHERE d.itinerary_id = ? AND d.day = ? AND i.user_id = ?
+                """,
+                (itinerary_id, day_number, user_email),
+            )
+            row = cursor.fetchone()
+            if not row:
+                return None
+
+            day = {**_day_from_row(row), **changes, "day": day_number}
+            cursor.execute(
+                f"""
+                INSERT OR REPLACE INTO itinerary_days ({_day_columns()})
+                VALUES ({", ".join("?" * len(DAY_COLUMNS))})
+                """,
+                _day_row(itinerary_id, day_number, day),
+            )
+            cursor.execute(
+                "UPDATE itineraries SET updated_at = ? WHERE id = ?",
+                (utc_timestamp(), itinerary_id),
+            )
+    finally:
+        conn.close()
 
-    conn.commit()
-    conn.close()
+    itinerary_cache.invalidate(itinerary_id)
+    return day
 
 
 # --------------------------------------------------
@@ -289,148 +710,12 @@ def update_itinerary_data(itinerary_id: int, updated_itinerary: dict):
 # --------------------------------------------------
 def upgrade_to_luxury(day: dict, destination: str) -> dict:
     """Upgrade a day's activities to high/luxury budget"""
-    upgraded = dict(day)
-
-    if (
-        "hotel" in upgraded.get("morning", "").lower()
-        or "check-in" in upgraded.get("morning", "").lower()
-    ):
-        upgraded["morning"] = (
-            upgraded["morning"]
-            .replace("hotel", "luxury 5-star hotel")
-            .replace("check-in", "VIP check-in at luxury resort")
-        )
-    if (
-        "walk" in upgraded.get("morning", "").lower()
-        or "explore" in upgraded.get("morning", "").lower()
-    ):
-        upgraded["morning"] = (
-            f"Private guided tour of {destination}'s exclusive morning spots with luxury transport"
-        )
-    if "market" in upgraded.get("morning", "").lower():
-        upgraded["morning"] = (
-            f"Private shopping experience at {destination}'s high-end boutiques with personal shopper"
-        )
-
-    if (
-        "museum" in upgraded.get("afternoon", "").lower()
-        or "tour" in upgraded.get("afternoon", "").lower()
-    ):
-        upgraded["afternoon"] = (
-            f"Private VIP museum tour with expert guide, skip-the-line access"
-        )
-    elif (
-        "beach" in upgraded.get("afternoon", "").lower()
-        or "relax" in upgraded.get("afternoon", "").lower()
-    ):
-        upgraded["afternoon"] = (
-            "Private beach cabana with butler service and premium amenities"
-        )
-    elif (
-        "sightsee" in upgraded.get("afternoon", "").lower()
-        or "visit" in upgraded.get("afternoon", "").lower()
-    ):
-        upgraded["afternoon"] = (
-            f"Luxury private car tour of {destination}'s landmarks with champagne service"
-        )
-    else:
-        upgraded["afternoon"] = (
-            f"Exclusive high-end experience: {upgraded.get('afternoon', 'Leisure time')} with premium service"
-        )
-
-    if (
-        "dinner" in upgraded.get("evening", "").lower()
-        or "restaurant" in upgraded.get("evening", "").lower()
-    ):
-        upgraded["evening"] = (
-            f"Michelin-starred dinner experience at {destination}'s finest restaurant with wine pairing"
-        )
-    elif (
-        "show" in upgraded.get("evening", "").lower()
-        or "entertainment" in upgraded.get("evening", "").lower()
-    ):
-        upgraded["evening"] = (
-            f"VIP box seats at premium show with backstage access and champagne"
-        )
-    else:
-        upgraded["evening"] = (
-            f"Sunset cocktail reception at luxury rooftop bar followed by gourmet dining"
-        )
-
-    if (
-        "local" in upgraded.get("food", "").lower()
-        or "street" in upgraded.get("food", "").lower()
-    ):
-        upgraded["food"] = (
-            f"Fine dining: {upgraded['food'].replace('street food', 'gourmet cuisine').replace('local', 'premium local')}"
-        )
-    else:
-        upgraded["food"] = (
-            f"Gourmet dining experience: {upgraded.get('food', ' chef tasting menu')}"
-        )
-
-    if upgraded.get("notes"):
-        upgraded["notes"] = (
-            f"All bookings include VIP service and premium transfers. {upgraded['notes']}"
-        )
-    else:
-        upgraded["notes"] = (
-            "Includes private transfers, priority access, and concierge service"
-        )
-
-    return upgraded
+    return LUXURY_RULES.apply(day, destination)
 
 
 def downgrade_to_budget(day: dict, destination: str) -> dict:
     """Downgrade a day's activities to low/budget"""
-    upgraded = dict(day)
-
-    if (
-        "luxury" in upgraded.get("morning", "").lower()
-        or "private" in upgraded.get("morning", "").lower()
-    ):
-        upgraded["morning"] = (
-            upgraded["morning"]
-            .replace("luxury", "comfortable")
-            .replace("private", "self-guided")
-        )
-    if "tour" in upgraded.get("morning", "").lower():
-        upgraded["morning"] = (
-            f"Self-guided walking tour of {destination} using free map app"
-        )
-
-    if (
-        "vip" in upgraded.get("afternoon", "").lower()
-        or "private" in upgraded.get("afternoon", "").lower()
-    ):
-        upgraded["afternoon"] = (
-            upgraded["afternoon"].replace("VIP", "Standard").replace("private", "group")
-        )
-    if (
-        "car" in upgraded.get("afternoon", "").lower()
-        or "transport" in upgraded.get("afternoon", "").lower()
-    ):
-        upgraded["afternoon"] = (
-            f"Public transport exploration of {destination} (buy day pass)"
-        )
-
-    if (
-        "michelin" in upgraded.get("evening", "").lower()
-        or "fine dining" in upgraded.get("evening", "").lower()
-    ):
-        upgraded["evening"] = (
-            "Casual dinner at highly-rated local eatery or food market"
-        )
-
-    upgraded["food"] = (
-        f"Budget-friendly: {upgraded.get('food', 'local street food and markets')}"
-    )
-
-    upgraded["notes"] = (
-        "Budget travel tips: Use public transport, book attractions online for discounts"
-    )
-
-    return upgraded
+    return BUDGET_RULES.apply(day, destination)
 
 
 def make_day_relaxing(day: dict, day_num: int, destination: str) -> dict:
@@ -476,42 +761,31 @@ def create_smart_modification(
     Handles combined requests (add day + modify existing).
     """
     message_lower = user_message.lower()
+    intents = detect_intents(message_lower)
     modified_itinerary = dict(current_itinerary)
 
-    if "days" not in modified_itinerary or not isinstance(
-        modified_itinerary["days"], list
-    ):
-        modified_itinerary["days"] = []
+    # Work on copies so the caller's itinerary is never modified in place
+    days = modified_itinerary.get("days")
+    days = (
+        [dict(day) if isinstance(day, dict) else day for day in days]
+        if isinstance(days, list)
+        else []
+    )
+    modified_itinerary["days"] = days
 
-    days = modified_itinerary["days"]
     destination = preferences.get("destination", "this destination")
-    current_budget = preferences.get("budget", "medium").lower()
 
     changes_made = []
 
     # 1. HANDLE ADD DAY REQUESTS (check first)
-    should_add_day = False
-    add_day_relaxing = False
-
-    if any(
-        phrase in message_lower
-        for phrase in [
-            "add day",
-            "extend trip",
-            "one more day",
-            "extra day",
-            "additional day",
-        ]
-    ):
-        should_add_day = True
-        if "relax" in message_lower:
-            add_day_relaxing = True
+    should_add_day = intents["add_day"]
+    add_day_relaxing = should_add_day and intents["relax"]
 
     if should_add_day and days:
         new_day_num = len(days) + 1
 
         # Check if user specified which day number (e.g., "day 3")
-        day_mentioned = re.search(r"day\s*(\d+)", message_lower)
+        day_mentioned = ADD_DAY_NUMBER_PATTERN.search(message_lower)
         if day_mentioned:
             requested_day = int(day_mentioned.group(1))
             new_day_num = requested_day if requested_day > len(days) else len(days) + 1
@@ -540,10 +814,8 @@ def create_smart_modification(
         )
 
     # 2. HANDLE MODIFY EXISTING DAYS (e.g., "update day 2", "make day 2 relaxing")
-    specific_day_match = re.search(
-        r"(?:update|modify|change)\s+day\s*(\d+)", message_lower
-    )
-    make_relaxing = "relax" in message_lower or "slow" in message_lower
+    specific_day_match = MODIFY_DAY_PATTERN.search(message_lower)
+    make_relaxing = intents["relaxing"]
 
     if specific_day_match:
         day_to_modify = int(specific_day_match.group(1))
@@ -555,7 +827,7 @@ def create_smart_modification(
                 changes_made.append(
                     f"Converted Day {day_to_modify} to a relaxing schedule"
                 )
-            elif "luxury" in message_lower or "high" in message_lower:
+            elif intents["luxury_day"]:
                 days[day_to_modify - 1] = upgrade_to_luxury(
                     days[day_to_modify - 1], destination
                 )
@@ -564,7 +836,7 @@ def create_smart_modification(
                 )
 
     # 3. HANDLE "ALL DAYS" or "ACCORDINGLY" requests (when adding day affects previous days)
-    if "accordingly" in message_lower or "update" in message_lower:
+    if intents["accordingly"]:
         # If we added a relaxing day, maybe make previous day less intense
         if add_day_relaxing and len(days) >= 2:
             # Make the day before the new last day slightly more relaxed
@@ -582,15 +854,13 @@ def create_smart_modification(
                 )
 
     # 4. HANDLE BUDGET UPDATES
-    if "budget" in message_lower or "luxury" in message_lower:
-        if any(
-            word in message_lower for word in ["high", "luxury", "expensive", "upgrade"]
-        ):
+    if intents["budget_change"]:
+        if intents["upgrade"]:
             modified_itinerary["days"] = [
                 upgrade_to_luxury(day, destination) for day in days
             ]
             changes_made.append("Upgraded entire itinerary to luxury budget")
-        elif any(word in message_lower for word in ["low", "cheap", "budget", "save"]):
+        elif intents["downgrade"]:
             modified_itinerary["days"] = [
                 downgrade_to_budget(day, destination) for day in days
             ]
@@ -616,76 +886,87 @@ def create_smart_modification(
 # --------------------------------------------------
 # LANGCHAIN CHAT PROCESSING
 # --------------------------------------------------
-def extract_json_from_text(text: str) -> dict:
-    """Extract JSON from text."""
-    text = text.strip()
+# Default (first) rung of the chat model ladder, see services/model_ladder
+CHAT_MODEL = CHAT_MODEL_LADDER[0]
 
-    if "```json" in text:
-        try:
-            json_part = text.split("```json")[1].split("```")[0].strip()
-            return json.loads(json_part)
-        except:
-            pass
+# "patch": the model returns day-level operations (see services/itinerary_patch)
+# "full":  the model returns the full updated itinerary and preferences
+CHAT_EDIT_MODE = os.getenv("CHAT_EDIT_MODE", "patch").lower()
 
-    if "```" in text:
-        try:
-            json_part = text.split("```")[1].split("```")[0].strip()
-            return json.loads(json_part)
-        except:
-            pass
 
-    try:
-        start = text.find("{")
-        end = text.rfind("}")
-        if start != -1 and end != -1 and end > start:
-            return json.loads(text[start : end + 1])
-    except:
-        pass
+# Each call is one circuit breaker sample, so the client does not retry on its
+# own (a failed call moves on to the next model on the ladder) and gives up
+# before the breaker would count the call as slow anyway
+CHAT_REQUEST_TIMEOUT_SECONDS = float(os.getenv("CHAT_REQUEST_TIMEOUT_SECONDS", "30"))
+if CIRCUIT_SLOW_CALL_SECONDS > 0:
+    CHAT_REQUEST_TIMEOUT_SECONDS = min(CHAT_REQUEST_TIMEOUT_SECONDS, CIRCUIT_SLOW_CALL_SECONDS)
 
-    try:
-        return json.loads(text)
-    except:
-        pass
+CHAT_LLM_CONFIG = {
+    "temperature": 0.1,
+    "convert_system_message_to_human": True,
+    "max_retries": 0,
+    "request_timeout": CHAT_REQUEST_TIMEOUT_SECONDS,
+}
 
-    return {}
 
+def get_chat_llm(model_name: str) -> ChatGoogleGenerativeAI:
+    return get_chat_model(model_name, **CHAT_LLM_CONFIG)
 
-def process_chat_modification(
-    itinerary_id: int,
-    user_message: str,
-    current_itinerary: dict,
-    preferences: dict,
-    chat_history: List[Dict],
-) -> Dict:
+
+def message_text(message) -> str:
+    """Text of a LangChain message or chunk, whether content is a string or a list of parts."""
+    content = message.content
+    if isinstance(content, str):
+        return content
+
+    parts = []
+    for part in content:
+        if isinstance(part, str):
+            parts.append(part)
+        elif isinstance(part, dict) and part.get("type") == "text":
+            parts.append(part.get("text", ""))
+    return "".join(parts)
+
+
+def compact_json(data) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def format_chat_history(chat_history: List[Dict]) -> str:
     """
-    Process chat message using LangChain and Gemini LLM.
-    Handles BOTH itinerary changes AND preference updates.
+    Quote the last CHAT_CONTEXT_MESSAGES messages and condense the user requests
+    before them into a single line, so prompt size stays flat as chats grow.
     """
+    if not chat_history:
+        return ""
 
-    models_to_try = ["gemini-2.5-flash-lite"]
+    split = max(len(chat_history) - CHAT_CONTEXT_MESSAGES, 0)
+    earlier, recent = chat_history[:split], chat_history[split:]
 
-    for model_name in models_to_try:
-        try:
-            print(f"Trying model: {model_name}")
-
-            llm = ChatGoogleGenerativeAI(
-                model=model_name,
-                temperature=0.1,
-                convert_system_message_to_human=True,
-                max_retries=2,
-                request_timeout=30,
-            )
+    history_str = ""
+    earlier_requests = [
+        msg["content"][:80] for msg in earlier if msg["role"] == "user"
+    ]
+    if earlier_requests:
+        history_str += f"Earlier requests: {'; '.join(earlier_requests)}\n"
+
+    for msg in recent:
+        role = "User" if msg["role"] == "user" else "Assistant"
+        history_str += f"{role}: {msg['content']}\n"
+    return history_str
 
-            current_itinerary_str = json.dumps(current_itinerary, indent=2)
-            current_preferences_str = json.dumps(preferences, indent=2)
 
-            history_str = ""
-            if chat_history:
-                for msg in chat_history[-2:]:
-                    role = "User" if msg["role"] == "user" else "Assistant"
-                    history_str += f"{role}: {msg['content']}\n"
+def build_chat_prompt(
+    user_message: str,
+    current_itinerary: dict,
+    preferences: dict,
+    chat_history: List[Dict],
+) -> str:
+    current_itinerary_str = compact_json(current_itinerary)
+    current_preferences_str = compact_json(preferences)
+    history_str = format_chat_history(chat_history)
 
-            prompt_text = f"""
+    return f"""
 You are a travel itinerary backend API.
 Return ONLY valid JSON. No explanation text.
 
@@ -731,49 +1012,150 @@ REQUIRED JSON FORMAT:
 }}
 """
 
-            response = llm.invoke([HumanMessage(content=prompt_text)])
-            response_text = response.content.strip()
 
-            print(f"Model response: {response_text[:300]}...")
+def normalize_chat_result(result: dict) -> Optional[Dict]:
+    """Validate a parsed LLM chat response; returns None if it is unusable."""
+    if not (
+        result
+        and "updated_itinerary" in result
+        and "updated_preferences" in result
+        and "response_message" in result
+    ):
+        return None
 
-            result = extract_json_from_text(response_text)
+    updated_preferences = result["updated_preferences"]
+    if not isinstance(updated_preferences, dict):
+        return None
 
-            if (
-                result
-                and "updated_itinerary" in result
-                and "updated_preferences" in result
-                and "response_message" in result
-            ):
-                updated_itinerary = result["updated_itinerary"]
-                updated_preferences = result["updated_preferences"]
-
-                # Normalize itinerary days
-                if isinstance(updated_itinerary.get("days"), list):
-                    for i, day in enumerate(updated_itinerary["days"]):
-                        day.setdefault("day", i + 1)
-                        for field in [
-                            "title",
-                            "morning",
-                            "afternoon",
-                            "evening",
-                            "food",
-                            "notes",
-                        ]:
-                            day.setdefault(field, "")
-
-                print("LLM update successful")
-
-                return {
-                    "response_message": result["response_message"],
-                    "updated_itinerary": updated_itinerary,
-                    "updated_preferences": updated_preferences,
-                }
+    try:
+        updated_itinerary = validate_itinerary(result["updated_itinerary"])
+    except LLMJSONError as e:
+        print(f"Rejected updated itinerary: {e}")
+        return None
 
-        except Exception as e:
-            print(f"Model failed: {str(e)[:150]}...")
-            continue
+    return {
+        "response_message": result["response_message"],
+        "updated_itinerary": updated_itinerary,
+        "updated_preferences": updated_preferences,
+    }
 
-    # 🔴 FALLBACK (no LLM)
+
+def build_chat_patch_prompt(
+    user_message: str,
+    current_itinerary: dict,
+    preferences: dict,
+    chat_history: List[Dict],
+) -> str:
+    current_itinerary_str = compact_json(current_itinerary)
+    current_preferences_str = compact_json(preferences)
+    history_str = format_chat_history(chat_history)
+
+    return f"""
+You are a travel itinerary backend API.
+Return ONLY valid JSON. No explanation text.
+
+CURRENT PREFERENCES:
+{current_preferences_str}
+
+CURRENT ITINERARY:
+{current_itinerary_str}
+
+CHAT HISTORY:
+{history_str}
+
+USER REQUEST:
+"{user_message}"
+
+INSTRUCTIONS:
+- Return ONLY the operations needed for this request, never unchanged days
+- If user mentions travellers, budget, style, pace → update_preferences with the changed keys
+- If user mentions days, activities, schedule → replace_day, insert_day or delete_day
+- replace_day "data" only needs the fields that change
+- Operations are applied in order; day numbers refer to the itinerary after the previous operations
+
+REQUIRED JSON FORMAT:
+{{
+  "response_message": "Short confirmation of what changed",
+  "operations": [
+    {{"op": "replace_day", "day": 2, "data": {{"title": "...", "evening": "..."}}}},
+    {{"op": "insert_day", "after": 3, "data": {{"title": "...", "morning": "...", "afternoon": "...", "evening": "...", "food": "...", "notes": "..."}}}},
+    {{"op": "delete_day", "day": 4}},
+    {{"op": "update_overview", "overview": "..."}},
+    {{"op": "update_preferences", "preferences": {{"budget": "low | medium | high"}}}}
+  ]
+}}
+"""
+
+
+def normalize_chat_patch_result(
+    result: dict, current_itinerary: dict, preferences: dict
+) -> Optional[Dict]:
+    """Validate and apply a patch-mode LLM response; returns None if it is unusable."""
+    if not (result and "response_message" in result and "operations" in result):
+        return None
+
+    try:
+        updated_itinerary, updated_preferences, changed_days = (
+            apply_itinerary_operations(
+                current_itinerary, preferences, result["operations"]
+            )
+        )
+    except InvalidPatchError as e:
+        print(f"Rejected itinerary patch: {e}")
+        return None
+
+    # Same checks as a full rewrite: model-supplied day fields and overview may
+    # be lists, objects or numbers
+    try:
+        updated_itinerary = validate_itinerary(updated_itinerary)
+    except LLMJSONError as e:
+        print(f"Rejected updated itinerary: {e}")
+        return None
+
+    return {
+        "response_message": result["response_message"],
+        "updated_itinerary": updated_itinerary,
+        "updated_preferences": updated_preferences,
+        "operations": result["operations"],
+        "changed_days": changed_days,
+    }
+
+
+def prepare_chat_request(
+    user_message: str,
+    current_itinerary: dict,
+    preferences: dict,
+    chat_history: List[Dict],
+):
+    """
+    Build the prompt for CHAT_EDIT_MODE.
+    Returns (prompt_text, parse_response, streamed_array_path).
+    """
+    if CHAT_EDIT_MODE == "full":
+        prompt_text = build_chat_prompt(
+            user_message, current_itinerary, preferences, chat_history
+        )
+
+        def parse_response(text: str) -> Optional[Dict]:
+            return normalize_chat_result(load_model_json(text))
+
+        return prompt_text, parse_response, ("updated_itinerary", "days")
+
+    prompt_text = build_chat_patch_prompt(
+        user_message, current_itinerary, preferences, chat_history
+    )
+
+    def parse_response(text: str) -> Optional[Dict]:
+        return normalize_chat_patch_result(
+            load_model_json(text), current_itinerary, preferences
+        )
+
+    return prompt_text, parse_response, ("operations",)
+
+
+def fallback_chat_result(
+    user_message: str, current_itinerary: dict, preferences: dict
+) -> Dict:
     print("Using smart fallback")
 
     fallback = create_smart_modification(user_message, current_itinerary, preferences)
@@ -785,31 +1167,172 @@ REQUIRED JSON FORMAT:
     }
 
 
-def process_chat_and_update(
+async def process_chat_modification(
+    itinerary_id: int,
+    user_message: str,
+    current_itinerary: dict,
+    preferences: dict,
+    chat_history: List[Dict],
+) -> Dict:
+    """
+    Process chat message using LangChain and Gemini LLM.
+    Handles BOTH itinerary changes AND preference updates.
+    """
+
+    prompt_text, parse_response, _ = prepare_chat_request(
+        user_message, current_itinerary, preferences, chat_history
+    )
+
+    async def attempt(model_name: str) -> Dict:
+        print(f"Trying model: {model_name}")
+
+        llm = get_chat_llm(model_name)
+
+        async with llm_slot():
+            with get_breaker(model_name).guard():
+                response = await llm.ainvoke([HumanMessage(content=prompt_text)])
+        response_text = message_text(response).strip()
+
+        print(f"Model response ({model_name}): {response_text[:300]}...")
+
+        result = parse_response(response_text)
+        if not result:
+            # Unusable reply: let the next (larger) model on the ladder try
+            raise ValueError(f"{model_name} returned an unparseable response")
+        return result
+
+    try:
+        result = await run_on_ladder(select_chat_models(len(prompt_text)), attempt)
+        print("LLM update successful")
+        return result
+    except Exception as e:
+        print(f"All chat models failed: {str(e)[:150]}...")
+
+    # 🔴 FALLBACK (no LLM)
+    return fallback_chat_result(user_message, current_itinerary, preferences)
+
+
+class ConcurrentModificationError(Exception):
+    """The itinerary changed between reading it and saving a chat turn."""
+
+
+def finalize_chat_turn(
+    itinerary_id: int,
+    user_message: str,
+    result: Dict,
+    expected_updated_at,
+    previous_itinerary: Optional[dict] = None,
+):
+    """
+    Persist a completed chat turn in one transaction: both messages, the itinerary
+    and the preferences. The itinerary is only written if its updated_at still
+    matches the version the turn was based on; otherwise nothing is saved and
+    ConcurrentModificationError is raised. Returns the two saved chat messages.
+    Only changed days are written: result["changed_days"] in patch mode, or the
+    days that differ from `previous_itinerary`.
+    """
+    meta, days = _split_itinerary(result["updated_itinerary"])
+    changed = result.get("changed_days")
+    if changed is None and previous_itinerary is not None:
+        changed = changed_day_numbers(previous_itinerary, result["updated_itinerary"])
+
+    now = utc_timestamp()
+    conn = get_db_connection()
+
+    try:
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                UPDATE itineraries
+                SET itinerary = ?, preferences = ?, updated_at = ?
+                WHERE id = ? AND updated_at IS ?
+                """,
+                (
+                    json.dumps(meta),
+                    json.dumps(result["updated_preferences"]),
+                    now,
+                    itinerary_id,
+                    expected_updated_at,
+                ),
+            )
+            if cursor.rowcount == 0:
+                raise ConcurrentModificationError(
+                    "Itinerary was modified by another request, please retry"
+                )
+
+            _write_days(cursor, itinerary_id, days, changed)
+
+            messages = []
+            for role, content in (
+                ("user", user_message),
+                ("assistant", result["response_message"]),
+            ):
+                cursor.execute(
+                    """
+                    INSERT INTO chat_messages (itinerary_id, role, content, created_at)
+                    VALUES (?, ?, ?, ?)
+                    """,
+                    (itinerary_id, role, content, now),
+                )
+                messages.append(
+                    {
+                        "id": cursor.lastrowid,
+                        "role": role,
+                        "content": content,
+                        "created_at": now,
+                    }
+                )
+    finally:
+        conn.close()
+        # Also on a conflict: the cached copy is what the turn was based on, and
+        # another process may have written a newer version
+        itinerary_cache.invalidate(itinerary_id)
+
+    print(f"Updated itinerary + preferences for itinerary {itinerary_id}")
+    return messages
+
+
+async def _chat_turn_history(itinerary_id: int, new_messages: List[Dict]) -> Dict:
+    """
+    History fields of a chat turn response: the turn's own messages (to append
+    to what the client already shows) and the latest page of the conversation,
+    with `next_before_id` for paging further back via the chat history route.
+    """
+    page = await run_blocking(
+        get_chat_history_page, itinerary_id, CHAT_RESPONSE_HISTORY_LIMIT
+    )
+    return {
+        "new_messages": new_messages,
+        "chat_history": page["items"],
+        "next_before_id": page["next_before_id"],
+    }
+
+
+async def process_chat_and_update(
     itinerary_id: int, user_email: str, user_message: str
 ) -> Dict:
     """
     Full chat workflow:
-    - Save user message
     - Process LLM
+    - Save both chat messages
     - Update itinerary
     - Update preferences
     - Return everything to frontend
     """
 
-    itinerary_data = get_itinerary_by_id(itinerary_id, user_email)
+    itinerary_data = await run_blocking(get_itinerary_by_id, itinerary_id, user_email)
     if not itinerary_data:
         raise ValueError("Itinerary not found or access denied")
 
     current_itinerary = itinerary_data["itinerary"]
     current_preferences = itinerary_data["preferences"]
 
-    chat_history = get_chat_history(itinerary_id)
-
-    # Save user message
-    save_chat_message(itinerary_id, "user", user_message)
+    chat_history = await run_blocking(
+        get_chat_history, itinerary_id, CHAT_CONTEXT_MESSAGES + CHAT_SUMMARY_MESSAGES
+    )
 
-    result = process_chat_modification(
+    result = await process_chat_modification(
         itinerary_id=itinerary_id,
         user_message=user_message,
         current_itinerary=current_itinerary,
@@ -817,28 +1340,102 @@ def process_chat_and_update(
         chat_history=chat_history,
     )
 
-    # Save assistant message
-    save_chat_message(itinerary_id, "assistant", result["response_message"])
+    new_messages = await run_blocking(
+        finalize_chat_turn,
+        itinerary_id,
+        user_message,
+        result,
+        itinerary_data["updated_at"],
+        current_itinerary,
+    )
 
-    update_itinerary_data(itinerary_id, result["updated_itinerary"])
+    return {
+        "success": True,
+        "response_message": result["response_message"],
+        "updated_itinerary": result["updated_itinerary"],
+        "updated_preferences": result["updated_preferences"],
+        **await _chat_turn_history(itinerary_id, new_messages),
+    }
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE itineraries SET preferences = ? WHERE id = ?",
-        (json.dumps(result["updated_preferences"]), itinerary_id),
+
+async def stream_chat_and_update(itinerary_data: dict, user_message: str):
+    """
+    Streaming chat workflow. Yields (event, data) pairs:
+    - ("token", {"text": ...}) as response_message characters arrive
+    - ("day", {...}) for each completed day of the updated itinerary ("full" mode)
+    - ("operation", {...}) for each completed day-level operation ("patch" mode)
+    - ("complete", {...}) once the turn has been saved
+    The itinerary and chat log are written once, after the model has finished.
+    """
+    itinerary_id = itinerary_data["id"]
+    current_itinerary = itinerary_data["itinerary"]
+    current_preferences = itinerary_data["preferences"]
+
+    chat_history = await run_blocking(
+        get_chat_history, itinerary_id, CHAT_CONTEXT_MESSAGES + CHAT_SUMMARY_MESSAGES
     )
-    conn.commit()
-    conn.close()
 
-    print(f"Updated itinerary + preferences for itinerary {itinerary_id}")
+    prompt_text, parse_response, array_path = prepare_chat_request(
+        user_message, current_itinerary, current_preferences, chat_history
+    )
+    parser = IncrementalJSONParser(
+        array_paths=[array_path],
+        string_paths=[("response_message",)],
+    )
+    item_event = "operation" if array_path == ("operations",) else "day"
+
+    # Streamed tokens cannot be merged across models, so no hedging here: use
+    # the first model on the ladder whose circuit is closed
+    model_name = next(
+        (
+            name
+            for name in select_chat_models(len(prompt_text))
+            if not get_breaker(name).rejects()
+        ),
+        None,
+    )
 
-    return {
+    result = None
+    if model_name is None:
+        print("No chat model available, using fallback")
+    else:
+        try:
+            breaker = get_breaker(model_name)
+            llm = get_chat_llm(model_name)
+
+            async with llm_slot():
+                with breaker.guard():
+                    async for chunk in llm.astream([HumanMessage(content=prompt_text)]):
+                        for kind, _, value in parser.feed(message_text(chunk)):
+                            if kind == "text":
+                                yield "token", {"text": value}
+                            elif kind == "item":
+                                yield item_event, value
+
+            result = parse_response(parser.text)
+        except Exception as e:
+            print(f"Streaming model failed: {str(e)[:150]}...")
+
+    if result is None:
+        result = fallback_chat_result(
+            user_message, current_itinerary, current_preferences
+        )
+
+    new_messages = await run_blocking(
+        finalize_chat_turn,
+        itinerary_id,
+        user_message,
+        result,
+        itinerary_data["updated_at"],
+        current_itinerary,
+    )
+
+    yield "complete", {
         "success": True,
         "response_message": result["response_message"],
         "updated_itinerary": result["updated_itinerary"],
         "updated_preferences": result["updated_preferences"],
-        "chat_history": get_chat_history(itinerary_id),
+        **await _chat_turn_history(itinerary_id, new_messages),
     }
 
 
@@ -861,15 +1458,19 @@ def delete_itinerary(itinerary_id: int, user_email: str) -> bool:
         if not row or row[0] != user_email:
             return False
 
-        # Delete associated chat messages first (data integrity)
+        # Delete associated chat messages and days first (data integrity)
         cursor.execute(
             "DELETE FROM chat_messages WHERE itinerary_id = ?", (itinerary_id,)
         )
+        cursor.execute(
+            "DELETE FROM itinerary_days WHERE itinerary_id = ?", (itinerary_id,)
+        )
 
         # Delete the itinerary itself
         cursor.execute("DELETE FROM itineraries WHERE id = ?", (itinerary_id,))
 
         conn.commit()
+        itinerary_cache.invalidate(itinerary_id)
         return True
     except Exception as e:
         print(f"Database error during deletion: {e}")
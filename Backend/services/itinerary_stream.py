@@ -0,0 +1,182 @@
+import json
+from typing import Iterable, List, Tuple
+
+# --------------------------------------------------
+# INCREMENTAL JSON PARSER
+# --------------------------------------------------
+# LLM responses arrive as text chunks. This parser scans them once, tracking
+# strings and nesting, and reports values at selected paths as soon as they
+# are complete, long before the whole document can be passed to json.loads.
+#
+# Paths are tuples of object keys, with "[]" standing for "inside an array":
+#   ("days",)                      -> the top-level "days" array
+#   ("updated_itinerary", "days")  -> days nested in "updated_itinerary"
+#
+# feed() returns a list of events:
+#   ("item", path, value)    an element of a tracked array has been closed
+#   ("text", path, delta)    more characters of a tracked string value arrived
+#   ("string", path, value)  a tracked string value is complete
+
+ARRAY = "["
+OBJECT = "{"
+
+
+class _Frame:
+    __slots__ = ("kind", "key", "expect_key", "tracked")
+
+    def __init__(self, kind: str, tracked: bool = False):
+        self.kind = kind
+        self.key = None
+        self.expect_key = kind == OBJECT
+        self.tracked = tracked
+
+
+class IncrementalJSONParser:
+    def __init__(
+        self,
+        array_paths: Iterable[Tuple[str, ...]] = (),
+        string_paths: Iterable[Tuple[str, ...]] = (),
+    ):
+        self.array_paths = {tuple(path) for path in array_paths}
+        self.string_paths = {tuple(path) for path in string_paths}
+
+        self.text = ""
+        self.done = False
+
+        self._pos = 0
+        self._stack: List[_Frame] = []
+
+        self._in_string = False
+        self._escape = False
+        self._unicode_remaining = 0
+        self._string_start = 0
+        self._string_is_key = False
+        self._string_path = None
+        self._delta_start = 0
+        self._safe_end = 0
+
+        self._item_start = None
+
+    # ---------------- helpers ----------------
+    def _value_path(self) -> Tuple[str, ...]:
+        return tuple(
+            "[]" if frame.kind == ARRAY else frame.key for frame in self._stack
+        )
+
+    def _flush_text(self, events: list, end: int):
+        if self._string_path is None or end <= self._delta_start:
+            return
+
+        raw = self.text[self._delta_start : end]
+        delta = json.loads(f'"{raw}"')
+
+        # Never split a surrogate pair across two deltas
+        if delta and "\ud800" <= delta[-1] <= "\udbff":
+            end -= 6
+            raw = self.text[self._delta_start : end]
+            delta = json.loads(f'"{raw}"')
+
+        if delta:
+            events.append(("text", self._string_path, delta))
+        self._delta_start = end
+
+    # ---------------- scanning ----------------
+    def feed(self, chunk: str) -> list:
+        events = []
+        if self.done or not chunk:
+            self.text += chunk or ""
+            return events
+
+        self.text += chunk
+        text = self.text
+
+        for i in range(self._pos, len(text)):
+            c = text[i]
+
+            if self._in_string:
+                if self._unicode_remaining:
+                    self._unicode_remaining -= 1
+                elif self._escape:
+                    self._escape = False
+                    if c == "u":
+                        self._unicode_remaining = 4
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._close_string(events, i)
+                    continue
+
+                if not self._escape and not self._unicode_remaining:
+                    self._safe_end = i + 1
+                continue
+
+            if not self._stack and c != OBJECT:
+                # Ignore code fences or chatter around the root object
+                continue
+
+            if c == '"':
+                top = self._stack[-1]
+                self._in_string = True
+                self._string_start = i
+                self._string_is_key = top.kind == OBJECT and top.expect_key
+                self._string_path = None
+                if not self._string_is_key:
+                    path = self._value_path()
+                    if path in self.string_paths:
+                        self._string_path = path
+                        self._delta_start = i + 1
+                        self._safe_end = i + 1
+            elif c in "{[":
+                parent = self._stack[-1] if self._stack else None
+                tracked = c == ARRAY and self._value_path() in self.array_paths
+                if c == OBJECT and parent is not None and parent.tracked:
+                    self._item_start = i
+                self._stack.append(_Frame(c, tracked))
+            elif c in "}]":
+                self._stack.pop()
+                if not self._stack:
+                    self.done = True
+                    self._pos = len(text)
+                    return events
+
+                parent = self._stack[-1]
+                if c == "}" and parent.tracked and self._item_start is not None:
+                    item = json.loads(text[self._item_start : i + 1])
+                    events.append(("item", self._value_path()[:-1], item))
+                    self._item_start = None
+            elif c == ":":
+                self._stack[-1].expect_key = False
+            elif c == ",":
+                top = self._stack[-1]
+                if top.kind == OBJECT:
+                    top.expect_key = True
+                    top.key = None
+
+        self._pos = len(text)
+        if self._in_string:
+            self._flush_text(events, self._safe_end)
+        return events
+
+    def _close_string(self, events: list, end: int):
+        self._in_string = False
+        raw = self.text[self._string_start : end + 1]
+
+        if self._string_is_key:
+            self._stack[-1].key = json.loads(raw)
+        elif self._string_path is not None:
+            self._flush_text(events, end)
+            events.append(("string", self._string_path, json.loads(raw)))
+            self._string_path = None
+
+
+# --------------------------------------------------
+# SERVER-SENT EVENTS
+# --------------------------------------------------
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # disable proxy buffering (nginx, Render)
+}
+
+
+def format_sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,350 @@
+import asyncio
+import json
+import os
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import config.env  # noqa: F401  (loads .env before settings are read)
+from database.database import get_db_connection, utc_timestamp
+from services.executor import run_blocking
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "5"))
+JOB_MAX_ACTIVE_PER_USER = int(os.getenv("JOB_MAX_ACTIVE_PER_USER", "3"))
+JOB_RATE_LIMIT_PER_MINUTE = int(os.getenv("JOB_RATE_LIMIT_PER_MINUTE", "10"))
+
+# Jobs left "running" this long (e.g. by a crashed process) are queued again at startup
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "600"))
+
+# Finished jobs are deleted this long after they finished; 0 keeps them forever
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+JOB_PRUNE_INTERVAL_SECONDS = float(os.getenv("JOB_PRUNE_INTERVAL_SECONDS", "3600"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+JobHandler = Callable[[dict, str], Awaitable[dict]]
+
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+_pruner_task: Optional[asyncio.Task] = None
+_handler: Optional[JobHandler] = None
+_stats = {
+    "enqueued": 0,
+    "succeeded": 0,
+    "failed": 0,
+    "retried": 0,
+    "rate_limited": 0,
+    "pruned": 0,
+}
+
+
+class JobRateLimitError(Exception):
+    """The user has too many active jobs or submitted too many recently."""
+
+
+# --------------------------------------------------
+# DATABASE
+# --------------------------------------------------
+def _job_from_row(row) -> Dict:
+    return {
+        "id": row["id"],
+        "status": row["status"],
+        "attempts": row["attempts"],
+        "error": row["error"],
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+
+
+def create_job(user_email: str, request: dict) -> Dict:
+    """Insert a queued job after checking the user's rate limits."""
+    now = utc_timestamp()
+    job_id = uuid.uuid4().hex
+
+    conn = get_db_connection()
+    try:
+        with conn:
+            cursor = conn.cursor()
+            # Take the write lock before counting, so concurrent submissions
+            # cannot both pass the limits and then both insert
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(
+                """
+                SELECT
+                    SUM(status IN (?, ?)) AS active,
+                    SUM(created_at >= ?) AS recent
+                FROM generation_jobs
+                WHERE user_id = ?
+                """,
+                (QUEUED, RUNNING, utc_timestamp(60), user_email),
+            )
+            row = cursor.fetchone()
+
+            if (row["active"] or 0) >= JOB_MAX_ACTIVE_PER_USER:
+                raise JobRateLimitError(
+                    f"At most {JOB_MAX_ACTIVE_PER_USER} itinerary jobs can be in progress"
+                )
+            if (row["recent"] or 0) >= JOB_RATE_LIMIT_PER_MINUTE:
+                raise JobRateLimitError(
+                    f"At most {JOB_RATE_LIMIT_PER_MINUTE} itinerary jobs per minute"
+                )
+
+            cursor.execute(
+                """
+                INSERT INTO generation_jobs (
+                    id, user_id, status, request, attempts, created_at, updated_at
+                )
+                VALUES (?, ?, ?, ?, 0, ?, ?)
+                """,
+                (job_id, user_email, QUEUED, json.dumps(request), now, now),
+            )
+    finally:
+        conn.close()
+
+    return {
+        "id": job_id,
+        "status": QUEUED,
+        "attempts": 0,
+        "error": None,
+        "result": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def get_job(job_id: str, user_email: str) -> Optional[Dict]:
+    """Retrieve a job (with ownership validation)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT id, user_id, status, result, error, attempts, created_at, updated_at
+        FROM generation_jobs
+        WHERE id = ?
+        """,
+        (job_id,),
+    )
+    row = cursor.fetchone()
+    conn.close()
+
+    if not row or row["user_id"] != user_email:
+        return None
+
+    return _job_from_row(row)
+
+
+def _claim_job(job_id: str) -> Optional[Dict]:
+    """Atomically move a queued job to running; None if another worker got it first."""
+    conn = get_db_connection()
+    try:
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                UPDATE generation_jobs
+                SET status = ?, attempts = attempts + 1, updated_at = ?
+                WHERE id = ? AND status = ?
+                """,
+                (RUNNING, utc_timestamp(), job_id, QUEUED),
+            )
+            if cursor.rowcount == 0:
+                return None
+
+            cursor.execute(
+                "SELECT user_id, request, attempts FROM generation_jobs WHERE id = ?",
+                (job_id,),
+            )
+            row = cursor.fetchone()
+    finally:
+        conn.close()
+
+    return {
+        "user_id": row["user_id"],
+        "request": json.loads(row["request"]),
+        "attempts": row["attempts"],
+    }
+
+
+def _finish_job(job_id: str, status: str, result: dict = None, error: str = None):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        UPDATE generation_jobs
+        SET status = ?, result = ?, error = ?, updated_at = ?
+        WHERE id = ?
+        """,
+        (
+            status,
+            json.dumps(result) if result is not None else None,
+            error,
+            utc_timestamp(),
+            job_id,
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _prune_jobs() -> int:
+    """Delete succeeded and failed jobs that finished more than JOB_RETENTION_SECONDS ago."""
+    if JOB_RETENTION_SECONDS <= 0:
+        return 0
+
+    conn = get_db_connection()
+    try:
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                DELETE FROM generation_jobs
+                WHERE status IN (?, ?) AND updated_at < ?
+                """,
+                (SUCCEEDED, FAILED, utc_timestamp(JOB_RETENTION_SECONDS)),
+            )
+            pruned = cursor.rowcount
+    finally:
+        conn.close()
+
+    _stats["pruned"] += pruned
+    return pruned
+
+
+def _recover_jobs() -> List[str]:
+    """Prune old finished jobs, re-queue stale running ones and return the ids of all queued jobs."""
+    _prune_jobs()
+
+    conn = get_db_connection()
+    try:
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                UPDATE generation_jobs
+                SET status = ?
+                WHERE status = ? AND updated_at < ?
+                """,
+                (QUEUED, RUNNING, utc_timestamp(JOB_STALE_SECONDS)),
+            )
+            cursor.execute(
+                "SELECT id FROM generation_jobs WHERE status = ? ORDER BY created_at",
+                (QUEUED,),
+            )
+            return [row["id"] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+# --------------------------------------------------
+# WORKERS
+# --------------------------------------------------
+async def _process(job_id: str):
+    job = await run_blocking(_claim_job, job_id)
+    if job is None:
+        return
+
+    try:
+        result = await _handler(job["request"], job["user_id"])
+    except asyncio.CancelledError:
+        # Shutting down: leave the job for the next process to pick up
+        await run_blocking(_finish_job, job_id, QUEUED, None, "Interrupted by shutdown")
+        raise
+    except Exception as e:
+        error = str(e) or type(e).__name__
+        if job["attempts"] < JOB_MAX_ATTEMPTS:
+            _stats["retried"] += 1
+            await run_blocking(_finish_job, job_id, QUEUED, None, error)
+            delay = JOB_RETRY_BACKOFF_SECONDS * job["attempts"]
+            asyncio.get_running_loop().call_later(delay, _queue.put_nowait, job_id)
+            print(f"Job {job_id} failed (attempt {job['attempts']}), retrying in {delay}s: {error}")
+        else:
+            _stats["failed"] += 1
+            await run_blocking(_finish_job, job_id, FAILED, None, error)
+            print(f"Job {job_id} failed permanently: {error}")
+        return
+
+    _stats["succeeded"] += 1
+    await run_blocking(_finish_job, job_id, SUCCEEDED, result, None)
+
+
+async def _worker():
+    while True:
+        job_id = await _queue.get()
+        try:
+            await _process(job_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Job worker error for {job_id}: {e}")
+        finally:
+            _queue.task_done()
+
+
+async def _pruner():
+    while True:
+        await asyncio.sleep(JOB_PRUNE_INTERVAL_SECONDS)
+        try:
+            pruned = await run_blocking(_prune_jobs)
+            if pruned:
+                print(f"Pruned {pruned} finished generation jobs")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Job pruning error: {e}")
+
+
+async def start_job_workers(handler: JobHandler):
+    """Start the background workers and pick up jobs left over from a previous run."""
+    global _queue, _handler, _pruner_task
+
+    _handler = handler
+    _queue = asyncio.Queue()
+
+    for job_id in await run_blocking(_recover_jobs):
+        _queue.put_nowait(job_id)
+
+    for _ in range(max(1, JOB_WORKERS)):
+        _workers.append(asyncio.create_task(_worker()))
+
+    if JOB_RETENTION_SECONDS > 0 and JOB_PRUNE_INTERVAL_SECONDS > 0:
+        _pruner_task = asyncio.create_task(_pruner())
+
+
+async def stop_job_workers():
+    global _pruner_task
+
+    tasks = _workers + ([_pruner_task] if _pruner_task is not None else [])
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _workers.clear()
+    _pruner_task = None
+
+
+async def enqueue_generation_job(user_email: str, request: dict) -> Dict:
+    try:
+        job = await run_blocking(create_job, user_email, request)
+    except JobRateLimitError:
+        _stats["rate_limited"] += 1
+        raise
+
+    _stats["enqueued"] += 1
+    _queue.put_nowait(job["id"])
+    return job
+
+
+def get_job_queue_stats() -> dict:
+    return {
+        **_stats,
+        "workers": len(_workers),
+        "queue_depth": _queue.qsize() if _queue is not None else 0,
+        "max_attempts": JOB_MAX_ATTEMPTS,
+    }
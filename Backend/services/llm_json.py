@@ -0,0 +1,219 @@
+import json
+import re
+from typing import Annotated, List, Optional, TypedDict
+
+from pydantic import BeforeValidator, ConfigDict, TypeAdapter, ValidationError
+
+from services.itinerary_patch import DAY_FIELDS
+
+# --------------------------------------------------
+# JSON EXTRACTION FROM LLM OUTPUT
+# --------------------------------------------------
+# Model replies are usually a JSON object, sometimes wrapped in ``` fences or
+# prose, and occasionally defective (trailing commas). The fast path hands the
+# text to the C decoder once per candidate "{" and ignores whatever follows the
+# object; braces in prose that cannot start an object are skipped without
+# decoding. Only when the decoder stops at a defect is the object repaired
+# (see _drop_trailing_commas) and decoded once more.
+#
+# A reply cut off before its object is closed (token limit) is not repaired:
+# closing it would silently drop whatever the model had not written yet, e.g.
+# the remaining days of an itinerary. It raises LLMJSONTruncatedError instead.
+
+_decoder = json.JSONDecoder()
+
+_WHITESPACE = " \t\r\n"
+
+# A comma directly before a closing bracket; dropped unless inside a string
+_TRAILING_COMMA = re.compile(r",\s*[}\]]")
+
+# Characters after the decoder's error position that show the text goes on
+_STRUCTURAL = re.compile(r'[{}\[\],:"]')
+
+
+class LLMJSONError(ValueError):
+    """The model's reply did not contain a usable JSON object."""
+
+
+class LLMJSONTruncatedError(LLMJSONError):
+    """The model's reply ends in the middle of its JSON object."""
+
+
+def _starts_object(text: str, position: int) -> bool:
+    """A JSON object opens with a key or closes at once: '{"' or '{}'."""
+    index = position + 1
+    length = len(text)
+    while index < length and text[index] in _WHITESPACE:
+        index += 1
+    return index < length and text[index] in '"}'
+
+
+def _ran_out(text: str, error: json.JSONDecodeError) -> bool:
+    """True when decoding failed because the text ended, not on a defect."""
+    if error.msg.startswith("Unterminated string"):
+        return True
+    return _STRUCTURAL.search(text, error.pos) is None
+
+
+def _drop_trailing_commas(text: str) -> str:
+    """
+    Remove commas before a closing bracket. Only the few candidate commas are
+    visited: an odd number of unescaped quotes before one means it is inside
+    a string. Quotes are counted with str.count, so the text is never walked
+    character by character in Python.
+    """
+    escapes = '\\"' in text
+
+    pieces = []
+    start = checked = quotes = 0
+    for match in _TRAILING_COMMA.finditer(text):
+        comma = match.start()
+        quotes += text.count('"', checked, comma)
+        if escapes:
+            # \" does not end a string, but \\" (an escaped backslash) does
+            quotes -= text.count('\\"', checked, comma)
+            quotes += text.count('\\\\"', checked, comma)
+        checked = comma
+        if quotes % 2 == 0:
+            pieces.append(text[start:comma])
+            start = comma + 1
+    if not pieces:
+        return text
+    pieces.append(text[start:])
+    return "".join(pieces)
+
+
+def extract_json_object(text: str) -> dict:
+    """
+    Return the first JSON object in `text`, repairing trailing commas. Raises
+    LLMJSONTruncatedError if the reply was cut off inside that object.
+    """
+    if not text:
+        raise LLMJSONError("Empty model response")
+
+    position = text.find("{")
+    while position != -1 and not _starts_object(text, position):
+        position = text.find("{", position + 1)
+    if position == -1:
+        raise LLMJSONError("No JSON object found in model response")
+
+    try:
+        value, _ = _decoder.raw_decode(text, position)
+        return value
+    except json.JSONDecodeError as e:
+        # Nothing is wrong before the point where the text ends, so there is
+        # nothing to repair
+        if _ran_out(text, e):
+            raise LLMJSONTruncatedError("Model response was cut off mid-object") from e
+
+    repaired = _drop_trailing_commas(text[position:])
+    try:
+        value, _ = _decoder.raw_decode(repaired)
+    except json.JSONDecodeError as e:
+        if _ran_out(repaired, e):
+            raise LLMJSONTruncatedError("Model response was cut off mid-object") from e
+        raise LLMJSONError(f"Malformed JSON in model response: {e.msg}") from e
+
+    print("Repaired malformed JSON in model response")
+    return value
+
+
+# --------------------------------------------------
+# ITINERARY SCHEMA
+# --------------------------------------------------
+def _as_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return "; ".join(_as_text(v) for v in value if v is not None)
+    if isinstance(value, dict):
+        return "; ".join(f"{k}: {_as_text(v)}" for k, v in value.items())
+    return str(value)
+
+
+# Model output often has lists or numbers where text is expected
+Text = Annotated[str, BeforeValidator(_as_text)]
+
+
+class ItineraryDaySchema(TypedDict):
+    """One day of a model-produced itinerary. Unknown keys are kept."""
+
+    __pydantic_config__ = ConfigDict(extra="allow")
+
+    day: int
+    title: Text
+    morning: Text
+    afternoon: Text
+    evening: Text
+    food: Text
+    notes: Text
+
+
+class ItinerarySchema(TypedDict):
+    """A model-produced itinerary. Unknown keys are kept."""
+
+    __pydantic_config__ = ConfigDict(extra="allow")
+
+    overview: Text
+    days: List[ItineraryDaySchema]
+
+
+_EMPTY_DAY = dict.fromkeys(DAY_FIELDS, "")
+
+
+def _fill_defaults(data: dict) -> dict:
+    # Days are stored by position, so number them that way: a model's own
+    # numbering can skip, repeat or be missing. Entries that are not objects
+    # cannot be repaired and are dropped.
+    days = [day for day in data["days"] if isinstance(day, dict)]
+    return {
+        "overview": "",
+        **data,
+        "days": [{**_EMPTY_DAY, **day, "day": number} for number, day in enumerate(days, 1)],
+    }
+
+
+# Validates and returns plain dicts: no model instances to build and dump
+_itinerary_adapter = TypeAdapter(Annotated[ItinerarySchema, BeforeValidator(_fill_defaults)])
+
+
+def validate_itinerary(data: dict, require_days: bool = True) -> dict:
+    """
+    Validate a model-produced itinerary against ItinerarySchema and repair what
+    can be repaired locally: missing or null fields become "", lists and
+    numbers become text, and days are numbered by position. Raises
+    LLMJSONError when there are no usable days.
+    """
+    if not isinstance(data, dict):
+        raise LLMJSONError("Itinerary must be a JSON object")
+
+    if not isinstance(data.get("days"), list):
+        if require_days:
+            raise LLMJSONError("Itinerary has no 'days' list")
+        data = {**data, "days": []}
+
+    try:
+        itinerary = _itinerary_adapter.validate_python(data)
+    except ValidationError as e:
+        raise LLMJSONError(f"Itinerary does not match the schema: {e}") from e
+
+    if require_days and not itinerary["days"]:
+        raise LLMJSONError("Itinerary has no usable days")
+
+    return itinerary
+
+
+def parse_itinerary_json(text: str) -> dict:
+    """Extract and validate an itinerary from a generation response."""
+    return validate_itinerary(extract_json_object(text))
+
+
+def load_model_json(text: str) -> Optional[dict]:
+    """extract_json_object() for callers with a fallback: logs and returns None on failure."""
+    try:
+        return extract_json_object(text)
+    except LLMJSONError as e:
+        print(f"Unusable model response: {e}")
+        return None
@@ -0,0 +1,179 @@
+import asyncio
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
+
+import google.generativeai as genai
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+import config.env  # noqa: F401  (loads .env before settings are read)
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+
+GENERATION_MODEL = "gemini-2.5-flash-lite"
+
+GENERATIVE = "generative"
+CHAT = "chat"
+
+_llm_semaphore: Optional[asyncio.Semaphore] = None
+_in_flight = 0
+_waiting = 0
+
+
+# --------------------------------------------------
+# CONCURRENCY LIMITER
+# --------------------------------------------------
+def _get_semaphore() -> asyncio.Semaphore:
+    global _llm_semaphore
+    if _llm_semaphore is None:
+        _llm_semaphore = asyncio.Semaphore(max(1, LLM_MAX_CONCURRENCY))
+    return _llm_semaphore
+
+
+@asynccontextmanager
+async def llm_slot():
+    """
+    Reserve one of the LLM_MAX_CONCURRENCY slots for the duration of an LLM call.
+    Callers beyond the cap wait here instead of piling requests onto Gemini.
+    """
+    global _in_flight, _waiting
+
+    semaphore = _get_semaphore()
+    _waiting += 1
+    try:
+        await semaphore.acquire()
+    finally:
+        _waiting -= 1
+
+    _in_flight += 1
+    try:
+        yield
+    finally:
+        _in_flight -= 1
+        semaphore.release()
+
+
+def get_llm_stats() -> dict:
+    return {
+        "max_concurrency": LLM_MAX_CONCURRENCY,
+        "in_flight": _in_flight,
+        "waiting": _waiting,
+        "registry": get_client_stats(),
+    }
+
+
+# --------------------------------------------------
+# CLIENT REGISTRY
+# --------------------------------------------------
+# LLM clients are created once per (kind, model, config) and shared by every
+# request, so HTTP/gRPC channels and TLS sessions are set up once per process.
+# Tests can swap in a local fake with override_client().
+_clients = {}
+_overrides = {}
+_clients_lock = threading.Lock()
+
+
+def _get_client(kind: str, model_name: str, config: dict, factory: Callable):
+    override = _overrides.get((kind, model_name))
+    if override is not None:
+        return override
+
+    key = (kind, model_name, tuple(sorted(config.items())))
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = factory()
+                _clients[key] = client
+    return client
+
+
+def get_generative_model(model_name: str = GENERATION_MODEL):
+    return _get_client(
+        GENERATIVE, model_name, {}, lambda: genai.GenerativeModel(model_name)
+    )
+
+
+def get_chat_model(model_name: str, **config):
+    return _get_client(
+        CHAT,
+        model_name,
+        config,
+        lambda: ChatGoogleGenerativeAI(model=model_name, **config),
+    )
+
+
+def override_client(kind: str, model_name: str, client):
+    """Use `client` for every request of this kind/model (e.g. a fake model in tests)."""
+    with _clients_lock:
+        _overrides[(kind, model_name)] = client
+
+
+def reset_clients():
+    with _clients_lock:
+        _clients.clear()
+        _overrides.clear()
+
+
+def get_client_stats() -> dict:
+    with _clients_lock:
+        return {
+            "clients": [
+                {"kind": kind, "model": model_name}
+                for kind, model_name, _ in _clients
+            ],
+            "overrides": [
+                {"kind": kind, "model": model_name} for kind, model_name in _overrides
+            ],
+        }
+
+
+# --------------------------------------------------
+# GENERATION
+# --------------------------------------------------
+async def generate_content(prompt: str, model_name: str = GENERATION_MODEL) -> str:
+    """Run a Gemini generation without blocking the event loop and return its text."""
+    async with llm_slot():
+        model = get_generative_model(model_name)
+        response = await asyncio.wait_for(
+            model.generate_content_async(prompt), timeout=LLM_TIMEOUT_SECONDS
+        )
+
+    return response.text
+
+
+async def stream_content(prompt: str, model_name: str = GENERATION_MODEL):
+    """
+    Stream a Gemini generation, yielding text chunks as they arrive.
+    LLM_TIMEOUT_SECONDS bounds the wait for each chunk rather than the whole stream.
+    """
+    async with llm_slot():
+        model = get_generative_model(model_name)
+        response = await asyncio.wait_for(
+            model.generate_content_async(prompt, stream=True),
+            timeout=LLM_TIMEOUT_SECONDS,
+        )
+
+        chunks = response.__aiter__()
+        while True:
+            try:
+                chunk = await asyncio.wait_for(
+                    chunks.__anext__(), timeout=LLM_TIMEOUT_SECONDS
+                )
+            except StopAsyncIteration:
+                break
+
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. the final finish_reason chunk)
+                continue
+
+            if text:
+                yield text
@@ -0,0 +1,159 @@
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import config.env  # noqa: F401  (loads .env before settings are read)
+from services.circuit_breaker import get_breaker
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+# Chat models from fastest/cheapest to most capable. A turn starts at the first
+# usable rung; a failure, an unparseable reply or a slow call moves on to the next.
+CHAT_MODEL_LADDER = [
+    name.strip()
+    for name in os.getenv(
+        "CHAT_MODEL_LADDER", "gemini-2.5-flash-lite,gemini-2.5-flash"
+    ).split(",")
+    if name.strip()
+]
+
+# Prompts longer than this (long trips, long requests) start on the second rung
+CHAT_LARGE_PROMPT_CHARS = int(os.getenv("CHAT_LARGE_PROMPT_CHARS", "24000"))
+
+# Models whose recent median latency is above this are tried after the others
+CHAT_MODEL_SLOW_SECONDS = float(os.getenv("CHAT_MODEL_SLOW_SECONDS", "20"))
+
+# Start the next rung alongside a call that has not answered after this long,
+# or after the model's recent p95 latency if that is shorter (0 disables hedging)
+CHAT_HEDGE_AFTER_SECONDS = float(os.getenv("CHAT_HEDGE_AFTER_SECONDS", "10"))
+
+# Latency samples a model needs before its percentiles are trusted
+MIN_LATENCY_SAMPLES = 5
+
+_stats = {"requests": 0, "hedged": 0, "escalated": 0, "wins": {}}
+
+
+class NoChatModelAvailable(Exception):
+    """Every model on the ladder is unavailable (open circuits or failed calls)."""
+
+
+# --------------------------------------------------
+# SELECTION
+# --------------------------------------------------
+def _recent_latency(model_name: str, fraction: float) -> Optional[float]:
+    return get_breaker(model_name).latency_percentile(fraction, MIN_LATENCY_SAMPLES)
+
+
+def select_chat_models(prompt_chars: int) -> List[str]:
+    """Order the ladder for one request by prompt size and recent latency."""
+    models = list(CHAT_MODEL_LADDER)
+
+    if prompt_chars > CHAT_LARGE_PROMPT_CHARS and len(models) > 1:
+        # Keep the small model as a last resort rather than dropping it
+        models = models[1:] + models[:1]
+
+    def is_slow(model_name: str) -> bool:
+        median = _recent_latency(model_name, 0.5)
+        return median is not None and median > CHAT_MODEL_SLOW_SECONDS
+
+    # Stable sort: slow models move to the back, the ladder order is kept otherwise
+    return sorted(models, key=is_slow)
+
+
+def hedge_delay(model_name: str) -> Optional[float]:
+    if CHAT_HEDGE_AFTER_SECONDS <= 0:
+        return None
+
+    p95 = _recent_latency(model_name, 0.95)
+    if p95 is None:
+        return CHAT_HEDGE_AFTER_SECONDS
+    return min(CHAT_HEDGE_AFTER_SECONDS, p95)
+
+
+# --------------------------------------------------
+# HEDGED EXECUTION
+# --------------------------------------------------
+async def run_on_ladder(
+    models: List[str], attempt: Callable[[str], Awaitable[Dict]]
+) -> Dict:
+    """
+    Run `attempt(model_name)` down the ladder and return the first successful
+    result. A failed call hands over to the next model immediately; a call
+    still running after hedge_delay() gets the next model started alongside
+    it. Calls that lose the race are cancelled.
+    """
+    _stats["requests"] += 1
+    loop = asyncio.get_running_loop()
+    remaining = list(models)
+    running: Dict[asyncio.Task, str] = {}
+    hedge_at = None
+    last_error: Optional[Exception] = None
+
+    def start_next() -> Optional[str]:
+        nonlocal hedge_at
+        while remaining:
+            model_name = remaining.pop(0)
+            if get_breaker(model_name).rejects():
+                print(f"Circuit open for {model_name}, skipping")
+                continue
+
+            running[asyncio.ensure_future(attempt(model_name))] = model_name
+            delay = hedge_delay(model_name)
+            hedge_at = loop.time() + delay if delay is not None else None
+            return model_name
+        return None
+
+    try:
+        start_next()
+        while running:
+            timeout = None
+            if remaining and hedge_at is not None:
+                timeout = max(0.0, hedge_at - loop.time())
+
+            done, _ = await asyncio.wait(
+                running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+
+            if not done:
+                hedge_model = start_next()
+                if hedge_model:
+                    _stats["hedged"] += 1
+                    print(f"Hedging slow chat request with {hedge_model}")
+                else:
+                    hedge_at = None
+                continue
+
+            winner = None
+            for task in done:
+                model_name = running.pop(task)
+                error = task.exception()
+                if error is None:
+                    winner = winner or (model_name, task)
+                else:
+                    last_error = error
+                    print(f"Model {model_name} failed: {str(error)[:150]}...")
+
+            if winner:
+                model_name, task = winner
+                _stats["wins"][model_name] = _stats["wins"].get(model_name, 0) + 1
+                return task.result()
+
+            if not running and remaining:
+                _stats["escalated"] += 1
+                start_next()
+    finally:
+        for task in running:
+            task.cancel()
+
+    raise last_error or NoChatModelAvailable("No chat model is currently available")
+
+
+def get_model_ladder_stats() -> dict:
+    return {
+        "ladder": CHAT_MODEL_LADDER,
+        "large_prompt_chars": CHAT_LARGE_PROMPT_CHARS,
+        "hedge_after_seconds": CHAT_HEDGE_AFTER_SECONDS,
+        **_stats,
+        "wins": dict(_stats["wins"]),
+    }
@@ -0,0 +1,100 @@
+import json
+import os
+import sys
+
+import firebase_admin
+import google.auth.credentials
+import pytest
+from firebase_admin import credentials
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import database  # noqa: E402
+from services.circuit_breaker import reset_breakers  # noqa: E402
+from services.itinerary_cache import itinerary_cache  # noqa: E402
+from services.llm_service import CHAT, override_client, reset_clients  # noqa: E402
+from services.model_ladder import CHAT_MODEL_LADDER  # noqa: E402
+
+TEST_USER = "alice@example.com"
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh database file for each test, with an empty itinerary cache."""
+    monkeypatch.setattr(database, "DB_NAME", str(tmp_path / "itineraries.db"))
+    database.init_db()
+    itinerary_cache.clear()
+    yield
+    itinerary_cache.clear()
+    database.close_pool()
+
+
+# --------------------------------------------------
+# APP
+# --------------------------------------------------
+class _TestCredential(credentials.Base):
+    """Lets main import without a service account; ID tokens are never verified."""
+
+    def get_credential(self):
+        return google.auth.credentials.AnonymousCredentials()
+
+
+@pytest.fixture
+def client(db):
+    """TestClient signed in as TEST_USER."""
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(_TestCredential())
+
+    import main
+    from auth.firebase_auth import get_current_user_email
+
+    main.app.dependency_overrides[get_current_user_email] = lambda: TEST_USER
+    try:
+        with TestClient(main.app) as test_client:
+            yield test_client
+    finally:
+        main.app.dependency_overrides.clear()
+
+
+# --------------------------------------------------
+# FAKE CHAT MODELS
+# --------------------------------------------------
+class FakeMessage:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class FakeChatModel:
+    """Stands in for ChatGoogleGenerativeAI: replies with `reply` or raises `error`."""
+
+    def __init__(self, reply=None, error: Exception = None):
+        self.reply = reply
+        self.error = error
+        self.prompts = []
+
+    def _text(self) -> str:
+        if self.error is not None:
+            raise self.error
+        return self.reply if isinstance(self.reply, str) else json.dumps(self.reply)
+
+    async def ainvoke(self, messages):
+        self.prompts.append(messages[0].content)
+        return FakeMessage(self._text())
+
+    async def astream(self, messages):
+        self.prompts.append(messages[0].content)
+        text = self._text()
+        for i in range(0, len(text), 16):
+            yield FakeMessage(text[i : i + 16])
+
+
+@pytest.fixture
+def fake_chat_models():
+    """A FakeChatModel for every model on the chat ladder, keyed by model name."""
+    models = {name: FakeChatModel() for name in CHAT_MODEL_LADDER}
+    for name, model in models.items():
+        override_client(CHAT, name, model)
+    yield models
+    reset_clients()
+    reset_breakers()
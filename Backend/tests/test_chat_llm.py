@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+from conftest import TEST_USER, FakeMessage
+
+from services.itinerary_service import get_chat_llm, get_itinerary_by_id, save_itinerary
+from services.llm_service import get_client_stats
+from services.model_ladder import CHAT_MODEL_LADDER, NoChatModelAvailable, run_on_ladder
+
+SMALL, LARGE = CHAT_MODEL_LADDER[0], CHAT_MODEL_LADDER[-1]
+
+PATCH_REPLY = {
+    "response_message": "Made day 2 a beach day",
+    "operations": [{"op": "replace_day", "day": 2, "data": {"title": "Beach"}}],
+}
+
+
+@pytest.fixture
+def itinerary_id(db):
+    days = [{"day": i, "title": f"Day {i}", "morning": "Walk"} for i in range(1, 4)]
+    return save_itinerary(
+        TEST_USER, "Lisbon", "2026-05-01", "2026-05-03", {"budget": "medium"},
+        {"overview": "Three days in Lisbon", "days": days},
+    )
+
+
+# --------------------------------------------------
+# CLIENT OVERRIDES
+# --------------------------------------------------
+def test_override_replaces_the_client(fake_chat_models):
+    assert get_chat_llm(SMALL) is fake_chat_models[SMALL]
+    assert {"kind": "chat", "model": SMALL} in get_client_stats()["overrides"]
+
+
+# --------------------------------------------------
+# CHAT ROUTE
+# --------------------------------------------------
+def test_chat_route_with_fake_model(client, itinerary_id, fake_chat_models):
+    fake_chat_models[SMALL].reply = PATCH_REPLY
+
+    response = client.post(f"/api/itineraries/{itinerary_id}/chat", json={"message": "Beach on day 2"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["response_message"] == "Made day 2 a beach day"
+    assert [day["title"] for day in body["updated_itinerary"]["days"]] == ["Day 1", "Beach", "Day 3"]
+    assert [m["role"] for m in body["new_messages"]] == ["user", "assistant"]
+    assert "Beach on day 2" in fake_chat_models[SMALL].prompts[0]
+    assert fake_chat_models[LARGE].prompts == []
+
+    saved = get_itinerary_by_id(itinerary_id, TEST_USER)
+    assert saved["itinerary"]["days"][1]["title"] == "Beach"
+
+
+def test_chat_route_escalates_on_unusable_reply(client, itinerary_id, fake_chat_models):
+    fake_chat_models[SMALL].reply = "Sorry, I cannot help with that."
+    fake_chat_models[LARGE].reply = PATCH_REPLY
+
+    response = client.post(f"/api/itineraries/{itinerary_id}/chat", json={"message": "Beach on day 2"})
+
+    assert response.status_code == 200
+    assert response.json()["response_message"] == "Made day 2 a beach day"
+    assert len(fake_chat_models[LARGE].prompts) == 1
+
+
+def test_chat_route_falls_back_when_every_model_fails(client, itinerary_id, fake_chat_models):
+    for model in fake_chat_models.values():
+        model.error = RuntimeError("quota exceeded")
+
+    response = client.post(f"/api/itineraries/{itinerary_id}/chat", json={"message": "Make day 2 relaxing"})
+
+    assert response.status_code == 200
+    assert all(model.prompts for model in fake_chat_models.values())
+    assert len(response.json()["updated_itinerary"]["days"]) == 3
+
+
+# --------------------------------------------------
+# run_on_ladder
+# --------------------------------------------------
+async def ask(model_name: str) -> dict:
+    response = await get_chat_llm(model_name).ainvoke([FakeMessage("ping")])
+    return {"model": model_name, "text": response.content}
+
+
+def test_run_on_ladder_returns_first_success(fake_chat_models):
+    fake_chat_models[SMALL].reply = "small"
+
+    result = asyncio.run(run_on_ladder(CHAT_MODEL_LADDER, ask))
+
+    assert result == {"model": SMALL, "text": "small"}
+
+
+def test_run_on_ladder_moves_on_after_a_failure(fake_chat_models):
+    fake_chat_models[SMALL].error = RuntimeError("quota exceeded")
+    fake_chat_models[LARGE].reply = "large"
+
+    result = asyncio.run(run_on_ladder(CHAT_MODEL_LADDER, ask))
+
+    assert result == {"model": LARGE, "text": "large"}
+
+
+def test_run_on_ladder_raises_the_last_error(fake_chat_models):
+    for model in fake_chat_models.values():
+        model.error = RuntimeError("quota exceeded")
+
+    with pytest.raises(RuntimeError, match="quota exceeded"):
+        asyncio.run(run_on_ladder(CHAT_MODEL_LADDER, ask))
+
+
+def test_run_on_ladder_without_models():
+    with pytest.raises(NoChatModelAvailable):
+        asyncio.run(run_on_ladder([], ask))
@@ -0,0 +1,68 @@
+import sqlite3
+import threading
+
+import pytest
+
+from database.database import ConnectionPool
+
+
+class BrokenConnection:
+    """Fails the rollback release() does for a connection left in a transaction."""
+
+    in_transaction = True
+
+    def rollback(self):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), max_size=1, timeout=2)
+    yield pool
+    pool.close_all()
+
+
+def test_connections_are_reused(pool):
+    conn = pool.acquire()
+    pool.release(conn)
+
+    assert pool.acquire() is conn
+    assert pool.stats()["open_connections"] == 1
+
+
+def test_broken_connection_is_replaced(pool):
+    pool.acquire()
+    pool.release(BrokenConnection())
+
+    conn = pool.acquire()
+    assert conn.execute("SELECT 1").fetchone()[0] == 1
+    stats = pool.stats()
+    assert stats["open_connections"] == 1
+    assert stats["in_use"] == 1
+
+
+def test_broken_connection_wakes_a_waiter(pool):
+    pool.acquire()
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+    waiter.start()
+
+    while pool.stats()["waited"] == 0:
+        pass
+    pool.release(BrokenConnection())
+    waiter.join(timeout=2)
+
+    assert not waiter.is_alive()
+    assert acquired[0].execute("SELECT 1").fetchone()[0] == 1
+
+
+def test_timeout_when_exhausted(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), max_size=1, timeout=0.05)
+    pool.acquire()
+
+    with pytest.raises(sqlite3.OperationalError, match="Timed out"):
+        pool.acquire()
+    assert pool.stats()["in_use"] == 1
@@ -0,0 +1,66 @@
+import asyncio
+import io
+import threading
+import zipfile
+
+from conftest import TEST_USER
+
+from services.executor import get_executor_stats, iterate_blocking
+from services.itinerary_service import save_itinerary
+
+
+async def collect(iterable) -> list:
+    return [item async for item in iterate_blocking(iterable)]
+
+
+def test_items_are_produced_on_worker_threads():
+    threads = []
+
+    def produce():
+        for i in range(3):
+            threads.append(threading.current_thread().name)
+            yield i
+
+    before = get_executor_stats()["completed"]
+
+    assert asyncio.run(collect(produce())) == [0, 1, 2]
+    assert all(name.startswith("blocking-worker") for name in threads)
+    # One call per item, plus the one that finds the end
+    assert get_executor_stats()["completed"] - before == 4
+
+
+def test_generator_is_closed_when_the_consumer_stops():
+    closed = []
+
+    def produce():
+        try:
+            yield from range(10)
+        finally:
+            closed.append(True)
+
+    async def take_one():
+        stream = iterate_blocking(produce())
+        item = await stream.__anext__()
+        await stream.aclose()
+        return item
+
+    assert asyncio.run(take_one()) == 0
+    assert closed == [True]
+
+
+def test_exports_run_on_the_worker_pool(client):
+    days = [{"day": 1, "title": "Old town", "morning": "Walk"}]
+    itinerary_id = save_itinerary(
+        TEST_USER, "Lisbon", "2026-05-01", "2026-05-01", {}, {"overview": "Lisbon", "days": days}
+    )
+
+    before = get_executor_stats()["completed"]
+    single = client.get(f"/api/itineraries/{itinerary_id}/export?format=markdown")
+    after_single = get_executor_stats()["completed"]
+    archive = client.get("/api/itineraries/export")
+
+    assert single.status_code == 200 and "Old town" in single.text
+    # Version and itinerary lookups, then at least one chunk and the end
+    assert after_single - before >= 4
+    assert get_executor_stats()["completed"] - after_single >= 2
+    assert zipfile.ZipFile(io.BytesIO(archive.content)).namelist() == [f"{itinerary_id}_Lisbon_itinerary.md"]
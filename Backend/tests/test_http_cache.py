@@ -0,0 +1,44 @@
+import pytest
+from conftest import TEST_USER
+
+from services.http_cache import etag_matches, make_etag
+from services.itinerary_service import save_itinerary
+
+
+def test_etags_are_weak():
+    etag = make_etag("itinerary", 1, "2026-05-01T10:00:00+00:00")
+
+    assert etag.startswith('W/"') and etag.endswith('"')
+    assert etag == make_etag("itinerary", 1, "2026-05-01T10:00:00+00:00")
+    assert etag != make_etag("itinerary", 1, "2026-05-01T10:00:01+00:00")
+
+
+@pytest.mark.parametrize(
+    "header",
+    ['W/"abc"', '"abc"', '"x", W/"abc"', "*"],
+)
+def test_weak_comparison(header):
+    assert etag_matches(header, 'W/"abc"')
+
+
+@pytest.mark.parametrize("header", [None, "", '"abcd"', 'W/"ab"'])
+def test_mismatch(header):
+    assert not etag_matches(header, 'W/"abc"')
+
+
+def test_gzipped_response_revalidates(client):
+    days = [{"day": i, "title": f"Day {i}", "morning": "Walk the old town " * 20} for i in range(1, 6)]
+    itinerary_id = save_itinerary(
+        TEST_USER, "Lisbon", "2026-05-01", "2026-05-05", {}, {"overview": "Lisbon", "days": days}
+    )
+    url = f"/api/itineraries/{itinerary_id}"
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    etag = response.headers["etag"]
+    assert etag.startswith("W/")
+
+    for accept_encoding in ("gzip", "identity"):
+        revalidated = client.get(url, headers={"If-None-Match": etag, "Accept-Encoding": accept_encoding})
+        assert revalidated.status_code == 304
+        assert revalidated.headers["etag"] == etag
@@ -0,0 +1,219 @@
+import pytest
+
+from database.database import get_db_connection
+from services import itinerary_cache as itinerary_cache_module
+from services import itinerary_service
+from services.itinerary_cache import ItineraryCache, itinerary_cache
+from services.itinerary_service import (
+    ConcurrentModificationError,
+    delete_itinerary,
+    finalize_chat_turn,
+    get_itinerary_by_id,
+    save_itinerary,
+    update_itinerary_day,
+)
+
+OWNER = "alice@example.com"
+
+
+def sample_itinerary(title: str = "Old town") -> dict:
+    return {
+        "overview": "Three days in Lisbon",
+        "days": [
+            {"day": i, "title": f"{title} {i}", "morning": "Walk", "afternoon": "Museum"}
+            for i in range(1, 4)
+        ],
+    }
+
+
+@pytest.fixture
+def itinerary_id(db):
+    return save_itinerary(
+        OWNER, "Lisbon", "2026-05-01", "2026-05-03", {"budget": "medium"}, sample_itinerary()
+    )
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+def write_elsewhere(itinerary_id: int, overview: str):
+    """Change the row directly, the way another process sharing the database would."""
+    conn = get_db_connection()
+    conn.execute(
+        """
+        UPDATE itineraries
+        SET itinerary = json_set(itinerary, '$.overview', ?), updated_at = '2099-01-01 00:00:00'
+        WHERE id = ?
+        """,
+        (overview, itinerary_id),
+    )
+    conn.commit()
+    conn.close()
+
+
+# --------------------------------------------------
+# get_itinerary_by_id
+# --------------------------------------------------
+def test_miss_then_hit(itinerary_id):
+    start = itinerary_cache.stats()
+    first = get_itinerary_by_id(itinerary_id, OWNER)
+    second = get_itinerary_by_id(itinerary_id, OWNER)
+
+    assert first["itinerary"]["days"][0]["title"] == "Old town 1"
+    assert second is first
+    stats = itinerary_cache.stats()
+    assert stats["misses"] - start["misses"] == 1
+    assert stats["hits"] - start["hits"] == 1
+    assert stats["size"] == 1
+
+
+def test_hit_checks_ownership(itinerary_id):
+    get_itinerary_by_id(itinerary_id, OWNER)
+    hits = itinerary_cache.stats()["hits"]
+
+    assert get_itinerary_by_id(itinerary_id, "mallory@example.com") is None
+    assert itinerary_cache.stats()["hits"] == hits + 1
+
+
+def test_other_users_miss_is_not_cached(itinerary_id):
+    assert get_itinerary_by_id(itinerary_id, "mallory@example.com") is None
+    assert itinerary_cache.stats()["size"] == 0
+
+
+def test_unknown_id(db):
+    assert get_itinerary_by_id(12345, OWNER) is None
+
+
+# --------------------------------------------------
+# INVALIDATION ON WRITE
+# --------------------------------------------------
+def test_update_itinerary_day_invalidates(itinerary_id):
+    before = get_itinerary_by_id(itinerary_id, OWNER)
+
+    update_itinerary_day(itinerary_id, OWNER, 2, {"title": "Sintra"})
+
+    after = get_itinerary_by_id(itinerary_id, OWNER)
+    assert after["itinerary"]["days"][1]["title"] == "Sintra"
+    assert after["updated_at"] != before["updated_at"]
+    # The record handed out earlier is not modified in place
+    assert before["itinerary"]["days"][1]["title"] == "Old town 2"
+
+
+def test_finalize_chat_turn_invalidates(itinerary_id):
+    before = get_itinerary_by_id(itinerary_id, OWNER)
+    result = {
+        "response_message": "Switched to a beach day",
+        "updated_itinerary": sample_itinerary("Beach"),
+        "updated_preferences": {"budget": "high"},
+    }
+
+    finalize_chat_turn(
+        itinerary_id, "Make it a beach trip", result, before["updated_at"], before["itinerary"]
+    )
+
+    after = get_itinerary_by_id(itinerary_id, OWNER)
+    assert after["preferences"] == {"budget": "high"}
+    assert after["itinerary"]["days"][0]["title"] == "Beach 1"
+
+
+def test_finalize_chat_turn_conflict_invalidates(itinerary_id):
+    stale = get_itinerary_by_id(itinerary_id, OWNER)
+    write_elsewhere(itinerary_id, "Written by another process")
+    assert get_itinerary_by_id(itinerary_id, OWNER) is stale
+
+    result = {
+        "response_message": "Done",
+        "updated_itinerary": sample_itinerary("Beach"),
+        "updated_preferences": {"budget": "high"},
+    }
+    with pytest.raises(ConcurrentModificationError):
+        finalize_chat_turn(
+            itinerary_id, "Make it a beach trip", result, stale["updated_at"], stale["itinerary"]
+        )
+
+    fresh = get_itinerary_by_id(itinerary_id, OWNER)
+    assert fresh["itinerary"]["overview"] == "Written by another process"
+    assert fresh["preferences"] == {"budget": "medium"}
+
+
+def test_delete_itinerary_invalidates(itinerary_id):
+    get_itinerary_by_id(itinerary_id, OWNER)
+
+    assert delete_itinerary(itinerary_id, OWNER)
+
+    assert get_itinerary_by_id(itinerary_id, OWNER) is None
+    assert itinerary_cache.stats()["size"] == 0
+
+
+def test_read_racing_a_write_is_not_cached(itinerary_id, monkeypatch):
+    load_days = itinerary_service._load_days
+
+    def load_days_then_write(cursor, itinerary_ids):
+        days = load_days(cursor, itinerary_ids)
+        # The write commits after this read saw the old row
+        monkeypatch.setattr(itinerary_service, "_load_days", load_days)
+        update_itinerary_day(itinerary_id, OWNER, 1, {"title": "Coast 1"})
+        return days
+
+    monkeypatch.setattr(itinerary_service, "_load_days", load_days_then_write)
+
+    raced = get_itinerary_by_id(itinerary_id, OWNER)
+    assert raced["itinerary"]["days"][0]["title"] == "Old town 1"
+
+    assert get_itinerary_by_id(itinerary_id, OWNER)["itinerary"]["days"][0]["title"] == "Coast 1"
+
+
+# --------------------------------------------------
+# ItineraryCache
+# --------------------------------------------------
+def test_put_after_invalidate_is_dropped():
+    cache = ItineraryCache(max_size=10, ttl_seconds=60)
+
+    token = cache.token()
+    cache.invalidate(1)
+    cache.put(1, {"id": 1}, token)
+
+    assert cache.get(1) is None
+
+    cache.put(1, {"id": 1}, cache.token())
+    assert cache.get(1) == {"id": 1}
+
+
+def test_lru_eviction():
+    cache = ItineraryCache(max_size=2, ttl_seconds=60)
+    cache.put(1, {"id": 1}, cache.token())
+    cache.put(2, {"id": 2}, cache.token())
+
+    cache.get(1)  # 2 is now the least recently used
+    cache.put(3, {"id": 3}, cache.token())
+
+    assert cache.get(2) is None
+    assert cache.get(1) == {"id": 1}
+    assert cache.get(3) == {"id": 3}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(itinerary_cache_module, "time", clock)
+    cache = ItineraryCache(max_size=10, ttl_seconds=30)
+    cache.put(1, {"id": 1}, cache.token())
+
+    clock.now += 29
+    assert cache.get(1) == {"id": 1}
+
+    clock.now += 1
+    assert cache.get(1) is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_zero_size_disables_cache():
+    cache = ItineraryCache(max_size=0, ttl_seconds=60)
+    cache.put(1, {"id": 1}, cache.token())
+
+    assert cache.get(1) is None
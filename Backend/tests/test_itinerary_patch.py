@@ -0,0 +1,95 @@
+import pytest
+
+from services.itinerary_patch import InvalidPatchError, apply_itinerary_operations
+from services.itinerary_service import normalize_chat_patch_result
+
+
+def sample_itinerary() -> dict:
+    return {
+        "overview": "Three days in Lisbon",
+        "days": [
+            {"day": i, "title": f"Day {i}", "morning": "Walk", "afternoon": "", "evening": "",
+             "food": "", "notes": ""}
+            for i in range(1, 4)
+        ],
+    }
+
+
+def test_operations_apply_in_order_and_renumber():
+    itinerary, preferences, changed = apply_itinerary_operations(
+        sample_itinerary(),
+        {"budget": "low"},
+        [
+            {"op": "delete_day", "day": 1},
+            {"op": "insert_day", "after": 2, "data": {"title": "Sintra"}},
+            {"op": "update_preferences", "preferences": {"budget": "high"}},
+        ],
+    )
+
+    assert [day["title"] for day in itinerary["days"]] == ["Day 2", "Day 3", "Sintra"]
+    assert [day["day"] for day in itinerary["days"]] == [1, 2, 3]
+    assert changed == [1, 2, 3]
+    assert preferences == {"budget": "high"}
+
+
+def test_inputs_are_not_mutated():
+    original = sample_itinerary()
+    apply_itinerary_operations(
+        original, {}, [{"op": "replace_day", "day": 2, "data": {"title": "Beach"}}]
+    )
+
+    assert original == sample_itinerary()
+
+
+@pytest.mark.parametrize("day", [True, False, 0, 4, "two", None, 1.0])
+def test_invalid_day_numbers_are_rejected(day):
+    with pytest.raises(InvalidPatchError):
+        apply_itinerary_operations(
+            sample_itinerary(), {}, [{"op": "replace_day", "day": day, "data": {}}]
+        )
+
+
+def test_patch_result_is_validated_like_a_full_rewrite():
+    result = normalize_chat_patch_result(
+        {
+            "response_message": "Updated day 2",
+            "operations": [
+                {
+                    "op": "replace_day",
+                    "day": 2,
+                    "data": {
+                        "title": 42,
+                        "morning": ["Tram 28", "Castle"],
+                        "food": {"lunch": "Sardines"},
+                        "notes": None,
+                    },
+                }
+            ],
+        },
+        sample_itinerary(),
+        {},
+    )
+
+    day = result["updated_itinerary"]["days"][1]
+    assert day["title"] == "42"
+    assert day["morning"] == "Tram 28; Castle"
+    assert day["food"] == "lunch: Sardines"
+    assert day["notes"] == ""
+    assert result["changed_days"] == [2]
+
+
+def test_patch_deleting_every_day_is_rejected():
+    operations = [{"op": "delete_day", "day": 1} for _ in range(3)]
+
+    assert (
+        normalize_chat_patch_result(
+            {"response_message": "Done", "operations": operations}, sample_itinerary(), {}
+        )
+        is None
+    )
+
+
+def test_invalid_patch_is_rejected():
+    result = {"response_message": "Done", "operations": [{"op": "rename_trip"}]}
+
+    assert normalize_chat_patch_result(result, sample_itinerary(), {}) is None
@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from database.database import get_db_connection, utc_timestamp
+from services import job_queue
+from services.job_queue import FAILED, QUEUED, RUNNING, SUCCEEDED, _prune_jobs, _recover_jobs, create_job
+
+
+def add_job(status: str, age: timedelta) -> str:
+    job_id = create_job("alice@example.com", {"destination": "Lisbon"})["id"]
+    conn = get_db_connection()
+    conn.execute(
+        "UPDATE generation_jobs SET status = ?, updated_at = ? WHERE id = ?",
+        (status, utc_timestamp(age.total_seconds()), job_id),
+    )
+    conn.commit()
+    conn.close()
+    return job_id
+
+
+def job_ids() -> set:
+    conn = get_db_connection()
+    rows = conn.execute("SELECT id FROM generation_jobs").fetchall()
+    conn.close()
+    return {row["id"] for row in rows}
+
+
+def test_only_old_finished_jobs_are_pruned(db, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_RATE_LIMIT_PER_MINUTE", 100)
+    monkeypatch.setattr(job_queue, "JOB_MAX_ACTIVE_PER_USER", 100)
+    monkeypatch.setattr(job_queue, "JOB_RETENTION_SECONDS", 3600)
+    old = timedelta(hours=2)
+    recent = timedelta(minutes=5)
+
+    add_job(SUCCEEDED, old)
+    add_job(FAILED, old)
+    kept = {
+        add_job(SUCCEEDED, recent),
+        add_job(FAILED, recent),
+        add_job(QUEUED, old),
+        add_job(RUNNING, recent),
+    }
+
+    assert _prune_jobs() == 2
+    assert job_ids() == kept
+
+
+def test_recover_prunes_and_requeues(db, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_RETENTION_SECONDS", 3600)
+    monkeypatch.setattr(job_queue, "JOB_STALE_SECONDS", 600)
+
+    finished = add_job(SUCCEEDED, timedelta(days=2))
+    stale = add_job(RUNNING, timedelta(hours=1))
+
+    assert _recover_jobs() == [stale]
+    assert finished not in job_ids()
+
+
+def test_zero_retention_keeps_everything(db, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_RETENTION_SECONDS", 0)
+    finished = add_job(SUCCEEDED, timedelta(days=365))
+
+    assert _prune_jobs() == 0
+    assert finished in job_ids()
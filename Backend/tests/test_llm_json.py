@@ -0,0 +1,152 @@
+import json
+
+import pytest
+
+from services.llm_json import (
+    LLMJSONError,
+    LLMJSONTruncatedError,
+    extract_json_object,
+    load_model_json,
+    parse_itinerary_json,
+    validate_itinerary,
+)
+
+
+def itinerary_reply(num_days: int = 3) -> str:
+    return json.dumps(
+        {
+            "overview": "Lisbon",
+            "days": [{"day": i, "title": f"Day {i}", "morning": "Walk"} for i in range(1, num_days + 1)],
+        },
+        indent=2,
+    )
+
+
+# --------------------------------------------------
+# extract_json_object
+# --------------------------------------------------
+def test_plain_object():
+    assert extract_json_object('{"a": 1}') == {"a": 1}
+
+
+def test_fenced_reply_with_prose():
+    text = 'Here you go:\n```json\n{"a": [1, 2], "b": "x"}\n```\nEnjoy your trip!'
+
+    assert extract_json_object(text) == {"a": [1, 2], "b": "x"}
+
+
+def test_trailing_commas_are_repaired():
+    text = '```json\n{"a": [1, 2,], "b": {"c": "d",},\n}\n```'
+
+    assert extract_json_object(text) == {"a": [1, 2], "b": {"c": "d"}}
+
+
+def test_commas_inside_strings_are_kept():
+    text = '{"note": "a, }", "quote": "say \\"b, ]\\"", "path": "C:\\\\", "list": [1,],}'
+
+    assert extract_json_object(text) == {
+        "note": "a, }",
+        "quote": 'say "b, ]"',
+        "path": "C:\\",
+        "list": [1],
+    }
+
+
+@pytest.mark.parametrize(
+    "preamble",
+    [
+        "Use the { key to expand a day. ",
+        "Days are listed as {day}: ",
+        "Template {x, y} and a lone { brace\n",
+    ],
+)
+def test_braces_in_preamble_are_skipped(preamble):
+    assert extract_json_object(preamble + itinerary_reply())["overview"] == "Lisbon"
+
+
+@pytest.mark.parametrize("cut", [0.3, 0.6, 0.9, 0.99])
+def test_truncated_reply_is_rejected(cut):
+    reply = itinerary_reply(10)
+
+    with pytest.raises(LLMJSONTruncatedError):
+        extract_json_object("```json\n" + reply[: int(len(reply) * cut)])
+
+
+@pytest.mark.parametrize(
+    "text",
+    ['{"a": "unterminated', '{"a": tru', '{"a": [1, 2,', '{"a": 1, "b"', '{"a": "x\\'],
+)
+def test_truncation_at_any_token(text):
+    with pytest.raises(LLMJSONTruncatedError):
+        extract_json_object(text)
+
+
+def test_malformed_object_is_not_reported_as_truncated():
+    with pytest.raises(LLMJSONError) as error:
+        extract_json_object('{"a": 1 "b": 2}')
+
+    assert not isinstance(error.value, LLMJSONTruncatedError)
+
+
+@pytest.mark.parametrize("text", ["", "no json here", "only a { brace"])
+def test_no_object(text):
+    with pytest.raises(LLMJSONError):
+        extract_json_object(text)
+
+
+def test_load_model_json_returns_none_on_truncation():
+    assert load_model_json(itinerary_reply()[:-5]) is None
+
+
+# --------------------------------------------------
+# validate_itinerary
+# --------------------------------------------------
+def test_days_are_coerced_to_the_schema():
+    itinerary = validate_itinerary(
+        {
+            "overview": ["Coast", "City"],
+            "days": [
+                {"day": 7, "title": 3, "morning": ["Tram", None, "Castle"], "food": {"lunch": "Fish"}},
+                "not a day",
+                {"day": 7, "notes": None, "tip": "Keep extra keys"},
+            ],
+            "currency": "EUR",
+        }
+    )
+
+    assert itinerary["overview"] == "Coast; City"
+    assert itinerary["currency"] == "EUR"
+    first, second = itinerary["days"]
+    assert first == {
+        "day": 1,
+        "title": "3",
+        "morning": "Tram; Castle",
+        "afternoon": "",
+        "evening": "",
+        "food": "lunch: Fish",
+        "notes": "",
+    }
+    assert second["day"] == 2
+    assert second["tip"] == "Keep extra keys"
+
+
+def test_input_is_not_modified():
+    data = {"overview": "x", "days": [{"day": 5, "title": None}]}
+    validate_itinerary(data)
+
+    assert data == {"overview": "x", "days": [{"day": 5, "title": None}]}
+
+
+@pytest.mark.parametrize("data", [[], {"overview": "x"}, {"days": []}, {"days": ["a", 1]}])
+def test_unusable_itineraries_are_rejected(data):
+    with pytest.raises(LLMJSONError):
+        validate_itinerary(data)
+
+
+def test_days_are_optional_when_not_required():
+    assert validate_itinerary({"overview": "x"}, require_days=False) == {"overview": "x", "days": []}
+
+
+def test_parse_itinerary_json_rejects_truncation():
+    with pytest.raises(LLMJSONTruncatedError):
+        parse_itinerary_json(itinerary_reply(10)[:-40])
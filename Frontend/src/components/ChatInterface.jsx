@@ -64,7 +64,12 @@ export default function ChatInterface({ itineraryId, onItineraryUpdate }) {
           updated_preferences: responseData.updated_preferences,
         });
 
-        setMessages(responseData.chat_history || []);
+        // chat_history is only the latest page: append this turn's messages
+        // instead, replacing the optimistic copy of the user's message
+        setMessages((prev) => [
+          ...prev.filter((m) => m !== userMsg),
+          ...(responseData.new_messages || []),
+        ]);
       }
     } catch (err) {
       setError("Chat failed. Please try again.");